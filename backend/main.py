@@ -1,14 +1,49 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from backend.routes import analyze, generate_image, languages, admin, feedback, stats
+from backend.routes import analyze, generate_image, languages, admin, feedback, stats, health, audio, uploads, images
 from backend.auth.routes import api_router as auth_router
+from backend.services.image_ingest import FORM_OVERHEAD_BYTES, MAX_UPLOAD_BYTES, UploadLimitMiddleware
+from backend.services.inference_executor import inference_executor
+from backend.services.label_pack import LABEL_PACK_DIR, LABEL_PACK_URL_PREFIX, load_label_pack
+from backend.services.translation_providers import close_translator
+from backend.services.tts_cache import run_tts_janitor, tts_cache
+from backend.services.tts_warmup import run_tts_warmup_schedule, tts_warmup
+from backend.database import db
+from backend.services.model_registry import MODEL_LOAD_MODE, PRELOAD_MODELS, model_registry
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preload_task = None
+    load_label_pack()
+    janitor_task = asyncio.create_task(run_tts_janitor())
+    warmup_task = asyncio.create_task(run_tts_warmup_schedule(db))
+    if MODEL_LOAD_MODE == "startup":
+        # โหลดโมเดลเบื้องหลัง ระหว่างนี้ /health/ready ตอบ 503
+        if inference_executor.kind == "process":
+            # โมเดลถูกใช้ใน worker process เท่านั้น จึงโหลดใน worker แทน process หลัก
+            preload_task = asyncio.create_task(inference_executor.preload_workers(PRELOAD_MODELS))
+        else:
+            preload_task = asyncio.create_task(model_registry.preload(PRELOAD_MODELS))
+    yield
+    if preload_task and not preload_task.done():
+        preload_task.cancel()
+    janitor_task.cancel()
+    warmup_task.cancel()
+    tts_warmup.cancel()
+    inference_executor.shutdown()
+    await close_translator()
+    tts_cache.index.flush()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,11 +56,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-os.makedirs("tts_cache", exist_ok=True)
-app.mount("/audio", StaticFiles(directory="tts_cache"), name="audio")
+# ปฏิเสธ upload ที่ใหญ่เกินก่อนรับ body ทั้งหมด (batch รับได้หลายไฟล์)
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/analyze": MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+        "/analyze/batch": (MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES) * analyze.ANALYZE_BATCH_MAX_IMAGES,
+    },
+)
+
+os.makedirs(uploads.UPLOADS_DIR, exist_ok=True)
 
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+os.makedirs(LABEL_PACK_DIR, exist_ok=True)
+app.mount(LABEL_PACK_URL_PREFIX, StaticFiles(directory=LABEL_PACK_DIR), name="label_pack")
 
 # Register routers
 app.include_router(analyze.router, prefix="/analyze", tags=["analyze"])
@@ -35,6 +78,12 @@ app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
 app.include_router(feedback.router, prefix="/feedback", tags=["feedback"])
 app.include_router(stats.router, prefix="/stats", tags=["stats"])
+app.include_router(health.router, prefix="/health", tags=["health"])
+# /audio เสิร์ฟไฟล์ใน tts_cache และสร้างเสียงแบบ lazy เมื่อถูกเรียกครั้งแรก
+# /audio และ /uploads รองรับ ETag / 304 / Range (ดู services/static_media.py)
+app.include_router(audio.router, prefix="/audio", tags=["audio"])
+app.include_router(uploads.router, prefix="/uploads", tags=["uploads"])
+app.include_router(images.router, prefix="/images", tags=["images"])
 
 logging.info("Registered routes:")
 for route in app.routes:
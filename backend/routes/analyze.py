@@ -1,21 +1,29 @@
 from fastapi import APIRouter, UploadFile, Form, HTTPException, File, Depends, Security
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from backend.services.blip_service import describe_image
-from backend.services.yolo_service import detect_object
-from backend.services.translate import translate_text
-from backend.services.tts import generate_tts
-from backend.config.languages import languages
-from backend.services.admin_service import record_usage_stat
+from backend.services.blip_service import describe_image_async, describe_images_async
+from backend.services.yolo_service import detect_detection_async, detect_detections_async
+from backend.services.auto_mode import analyze_auto, analyze_auto_batch
+from backend.services.translation_pipeline import FANOUT_EXTRA_LABELS_MAX, fanout_tasks, run_language_fanout
+from backend.services.image_ingest import ingest_upload
+from backend.services.model_registry import ModelsDisabledError
+from backend.services.result_cache import (
+    RESULT_CACHE_ENABLED,
+    compute_image_hash,
+    normalize_mode,
+    result_cache,
+)
+from backend.services.admin_service import record_usage_stat, record_usage_stats_bulk
+from backend.services.tts_warmup import fanout_phrases, record_phrase_usage_background
 from backend.models.admin_models import UsageStat
 from backend.database import get_db  # ปรับตามที่เก็บจริง
 from jose import jwt, JWTError
 from PIL import Image
-import io
+import asyncio
 import json
 import logging
 import os
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 router = APIRouter()
 logger = logging.getLogger("analyze_image")
@@ -24,6 +32,9 @@ security = HTTPBearer()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 
+LIVING_KEYWORDS = ["animal", "human", "bird", "fish", "insect", "cat", "dog"]
+ANALYZE_BATCH_MAX_IMAGES = int(os.getenv("ANALYZE_BATCH_MAX_IMAGES", "50"))
+
 
 async def get_current_user_email(
     credentials: HTTPAuthorizationCredentials = Security(security),
@@ -41,6 +52,73 @@ async def get_current_user_email(
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+def classify_label(label: str) -> str:
+    return "living" if any(keyword in label.lower() for keyword in LIVING_KEYWORDS) else "non-living"
+
+
+def parse_langs(langs: str) -> List[str]:
+    # แปลง langs จาก JSON string → list
+    try:
+        langs_list: List[str] = json.loads(langs)
+        if not isinstance(langs_list, list):
+            raise ValueError("langs ต้องเป็น list ของชื่อภาษา")
+        return langs_list
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"รูปแบบข้อมูลภาษาไม่ถูกต้อง: {str(e)}")
+
+
+async def analyze_label(image_pil: Image.Image, mode: str, db) -> Tuple[str, str, str, List[dict]]:
+    """
+    วิเคราะห์ภาพ (ตรวจ cache ของภาพเดิม/ภาพใกล้เคียงก่อน)
+    คืนค่า (label, image_class, answered_by, objects) โดย objects คือวัตถุ top-K ที่ YOLO พบ (class ไม่ซ้ำ)
+    """
+    cache_mode = normalize_mode(mode)
+    if RESULT_CACHE_ENABLED:
+        phash = await compute_image_hash(image_pil)
+        cached = await result_cache.get(db, cache_mode, phash)
+        if cached:
+            logger.info(f"Result cache hit: {cached['label']}")
+            return cached["label"], cached["image_class"], "cache", cached.get("objects") or []
+
+    objects: List[dict] = []
+    try:
+        if cache_mode == "object":
+            detection = await detect_detection_async(image_pil)
+            label, answered_by = (detection["label"] if detection else None), "yolo"
+            objects = detection["objects"] if detection else []
+        elif cache_mode == "auto":
+            label, answered_by, objects = await analyze_auto(image_pil)
+        else:
+            label, answered_by = await describe_image_async(image_pil), "blip"
+    except ModelsDisabledError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not label:
+        raise HTTPException(status_code=400, detail="ไม่พบวัตถุเด่นในภาพ")
+    detected_image_class = classify_label(label)
+    if RESULT_CACHE_ENABLED:
+        await result_cache.put(db, cache_mode, phash, label, detected_image_class, objects)
+    return label, detected_image_class, answered_by, objects
+
+
+def extra_object_labels(label: str, objects: List[dict]) -> List[str]:
+    # label ของวัตถุอื่นในภาพที่ยังไม่ซ้ำกับ label หลัก (แปล + TTS ครั้งเดียวต่อ label) ไม่เกิน FANOUT_EXTRA_LABELS_MAX
+    labels: List[str] = []
+    for obj in objects:
+        if obj["label"] != label and obj["label"] not in labels:
+            labels.append(obj["label"])
+    return labels[:max(0, FANOUT_EXTRA_LABELS_MAX)]
+
+
+async def record_analyze_usage(db, user_email: str, detected_image_class: str) -> None:
+    usage_stat = UsageStat(
+        user_email=user_email,
+        language="th",  # สามารถปรับเป็น target language ตัวแรกของ langs_list
+        image_class=detected_image_class,
+        count=1
+    )
+    await record_usage_stat(db, usage_stat)
+
+
 @router.post("/")
 async def analyze_image(
     image: UploadFile = File(...),
@@ -50,72 +128,222 @@ async def analyze_image(
     user_email: str = Depends(get_current_user_email),
 ):
     try:
-        # อ่านไฟล์ภาพ
-        img_bytes = await image.read()
-        if not img_bytes:
-            raise HTTPException(status_code=400, detail="ไม่ได้รับไฟล์ภาพ")
+        image_pil = await ingest_upload(image, mode)
+        langs_list = parse_langs(langs)
 
-        image_pil = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+        label, detected_image_class, answered_by, objects = await analyze_label(image_pil, mode, db)
+        logger.info(f"Detected image class: {detected_image_class} (answered by {answered_by})")
 
-        # แปลง langs จาก JSON string → list
-        try:
-            langs_list: List[str] = json.loads(langs)
-            if not isinstance(langs_list, list):
-                raise ValueError("langs ต้องเป็น list ของชื่อภาษา")
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"รูปแบบข้อมูลภาษาไม่ถูกต้อง: {str(e)}")
-
-        # วิเคราะห์ภาพ
-        if "object" in mode.lower():
-            label = detect_object(image_pil)
-            if not label:
-                raise HTTPException(status_code=400, detail="ไม่พบวัตถุเด่นในภาพ")
-            detected_image_class = "living" if any(keyword in label.lower() for keyword in ["animal", "human", "bird", "fish", "insect", "cat", "dog"]) else "non-living"
-        else:
-            label = describe_image(image_pil)
-            detected_image_class = "living" if any(keyword in label.lower() for keyword in ["animal", "human", "bird", "fish", "insect", "cat", "dog"]) else "non-living"
+        # แปลภาษาไทย + ภาษาอื่น ๆ และ TTS พร้อมกัน (ภาษาที่ล้มเหลวจะอยู่ใน failed_languages)
+        # รวมถึงวัตถุอื่นในภาพ โดยแต่ละ label แปลเพียงครั้งเดียว
+        # วัตถุรองใช้คิวแยกและแปลเฉพาะภาษาไทยโดยค่าเริ่มต้น จึงไม่หน่วงภาษาของ label หลัก
+        labels = [label] + extra_object_labels(label, objects)
+        fanouts = await asyncio.gather(*[
+            run_language_fanout(text, langs_list, extra=(text != label)) for text in labels
+        ])
+        by_label = dict(zip(labels, fanouts))
+        result = dict(by_label[label])
+        result["answered_by"] = answered_by
+        result["objects"] = [{**obj, **by_label.get(obj["label"], {})} for obj in objects]
 
-        logger.info(f"Detected image class: {detected_image_class}")
+        # บันทึกสถิติการใช้งาน
+        await record_analyze_usage(db, user_email, detected_image_class)
+        record_phrase_usage_background(db, [phrase for fanout in fanouts for phrase in fanout_phrases(fanout)])
+
+        return result
 
-        # แปลภาษาไทย + TTS
-        th_text = translate_text(label, "th")
-        th_audio_url = generate_tts(th_text, "th")
+    except HTTPException as he:
+        logger.error(f"HTTPException: {he.detail}")
+        raise he
+    except Exception as e:
+        logger.error(f"Exception: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"error": "Internal Server Error"})
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@router.post("/stream")
+async def analyze_image_stream(
+    image: UploadFile = File(...),
+    mode: str = Form(...),
+    langs: str = Form(...),
+    db=Depends(get_db),
+    user_email: str = Depends(get_current_user_email),
+):
+    """
+    เหมือน analyze_image แต่ตอบกลับเป็น NDJSON ทีละบรรทัด:
+    label ทันทีหลัง inference แล้วตามด้วยคำแปล + audio ของแต่ละภาษา (และของวัตถุอื่นในภาพ) เมื่อเสร็จ
+    """
+    try:
+        image_pil = await ingest_upload(image, mode)
+        langs_list = parse_langs(langs)
+        label, detected_image_class, answered_by, objects = await analyze_label(image_pil, mode, db)
+    except HTTPException as he:
+        logger.error(f"HTTPException: {he.detail}")
+        raise he
+    except Exception as e:
+        logger.error(f"Exception: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"error": "Internal Server Error"})
 
-        result = {
+    async def events():
+        yield _ndjson({
+            "type": "label",
             "original": label,
-            "th": th_text,
-            "audio_url": th_audio_url,
-            "translations": []
-        }
-
-        # แปลภาษาอื่น ๆ และ TTS
-        for lang in langs_list:
-            lang_code = languages.get(lang)
-            if not lang_code:
-                logger.warning(f"ไม่พบรหัสภาษาสำหรับ: {lang}")
+            "image_class": detected_image_class,
+            "answered_by": answered_by,
+            "objects": objects,
+        })
+        tasks = []
+        for text in [label] + extra_object_labels(label, objects):
+            tasks.extend(fanout_tasks(text, langs_list, extra=(text != label)))
+        phrases = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                outcome = await next_done
+                if outcome["ok"]:
+                    phrases.append({
+                        "original": outcome["original"],
+                        "lang_code": outcome["lang_code"],
+                        "translated": outcome["translated"],
+                        "audio_url": outcome["audio_url"],
+                    })
+                    yield _ndjson({
+                        "type": "translation",
+                        "original": outcome["original"],
+                        "language": outcome["language"],
+                        "translated": outcome["translated"],
+                        "audio_url": outcome["audio_url"],
+                    })
+                else:
+                    yield _ndjson({
+                        "type": "error",
+                        "original": outcome["original"],
+                        "language": outcome["language"],
+                        "error": outcome["error"],
+                    })
+            await record_analyze_usage(db, user_email, detected_image_class)
+            record_phrase_usage_background(db, phrases)
+            yield _ndjson({"type": "done"})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def analyze_labels_batch(images: List[Image.Image], mode: str, db) -> List[Optional[Tuple[str, str, str, List[dict]]]]:
+    """
+    วิเคราะห์หลายภาพ: ภาพที่อยู่ใน cache ไม่ต้อง inference ส่วนที่เหลือรัน inference เป็น batch
+    คืนค่า (label, image_class, answered_by, objects) ตามลำดับภาพ (เหมือน analyze_label) หรือ None ถ้าไม่พบวัตถุ
+    """
+    cache_mode = normalize_mode(mode)
+    outcomes: List[Optional[Tuple[str, str, str, List[dict]]]] = [None] * len(images)
+    hashes: List[Optional[int]] = [None] * len(images)
+    pending: List[int] = []
+
+    for i, image_pil in enumerate(images):
+        if RESULT_CACHE_ENABLED:
+            hashes[i] = await compute_image_hash(image_pil)
+            cached = await result_cache.get(db, cache_mode, hashes[i])
+            if cached:
+                outcomes[i] = (cached["label"], cached["image_class"], "cache", cached.get("objects") or [])
+                continue
+        pending.append(i)
+
+    if pending:
+        pending_images = [images[i] for i in pending]
+        try:
+            if cache_mode == "object":
+                answers = [
+                    (detection["label"], "yolo", detection["objects"]) if detection else (None, "yolo", [])
+                    for detection in await detect_detections_async(pending_images)
+                ]
+            elif cache_mode == "auto":
+                answers = await analyze_auto_batch(pending_images)
+            else:
+                answers = [(label, "blip", []) for label in await describe_images_async(pending_images)]
+        except ModelsDisabledError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        for i, (label, answered_by, objects) in zip(pending, answers):
+            if not label:
                 continue
+            outcomes[i] = (label, classify_label(label), answered_by, objects)
+            if RESULT_CACHE_ENABLED:
+                await result_cache.put(db, cache_mode, hashes[i], label, outcomes[i][1], objects)
+    return outcomes
+
+
+@router.post("/batch")
+async def analyze_images_batch(
+    images: List[UploadFile] = File(...),
+    mode: str = Form(...),
+    langs: str = Form(...),
+    db=Depends(get_db),
+    user_email: str = Depends(get_current_user_email),
+):
+    """
+    วิเคราะห์หลายภาพใน request เดียว label ที่ซ้ำกันจะแปล + TTS เพียงครั้งเดียวต่อภาษา
+    """
+    try:
+        if len(images) > ANALYZE_BATCH_MAX_IMAGES:
+            raise HTTPException(status_code=400, detail=f"ส่งภาพได้ไม่เกิน {ANALYZE_BATCH_MAX_IMAGES} ภาพต่อครั้ง")
+        langs_list = parse_langs(langs)
+        # ไฟล์ที่เสีย/ใหญ่เกินจะถูกรายงานในรายการของภาพนั้น ไม่ทำให้ทั้ง batch ล้ม
+        images_pil: List[Optional[Image.Image]] = []
+        ingest_errors: Dict[int, str] = {}
+        for i, image in enumerate(images):
             try:
-                translated = translate_text(label, lang_code)
-                audio_url = generate_tts(translated, lang_code)
-                result["translations"].append({
-                    "language": lang,
-                    "translated": translated,
-                    "audio_url": audio_url
-                })
-            except Exception as e:
-                logger.error(f"แปลภาษา {lang} ไม่สำเร็จ: {e}")
+                images_pil.append(await ingest_upload(image, mode))
+            except HTTPException as he:
+                ingest_errors[i] = he.detail
+                images_pil.append(None)
+
+        valid = [i for i, image_pil in enumerate(images_pil) if image_pil is not None]
+        outcomes: List[Optional[Tuple[str, str, str, List[dict]]]] = [None] * len(images)
+        if valid:
+            analyzed = await analyze_labels_batch([images_pil[i] for i in valid], mode, db)
+            for i, outcome in zip(valid, analyzed):
+                outcomes[i] = outcome
+
+        items = []
+        unique_labels: List[str] = []
+        primary_labels = set()
+        for i, (upload, outcome) in enumerate(zip(images, outcomes)):
+            if i in ingest_errors:
+                items.append({"filename": upload.filename, "error": ingest_errors[i]})
                 continue
+            if outcome is None:
+                items.append({"filename": upload.filename, "error": "ไม่พบวัตถุเด่นในภาพ"})
+                continue
+            label, detected_image_class, answered_by, objects = outcome
+            items.append({
+                "filename": upload.filename,
+                "original": label,
+                "image_class": detected_image_class,
+                "answered_by": answered_by,
+                "objects": objects,
+            })
+            primary_labels.add(label)
+            for text in [label] + extra_object_labels(label, objects):
+                if text not in unique_labels:
+                    unique_labels.append(text)
 
-        # บันทึกสถิติการใช้งาน
-        usage_stat = UsageStat(
-            user_email=user_email,
-            language="th",  # สามารถปรับเป็น target language ตัวแรกของ langs_list
-            image_class=detected_image_class,
-            count=1
-        )
-        await record_usage_stat(db, usage_stat)
+        # แปล + TTS ต่อ label ที่ไม่ซ้ำเท่านั้น (รวม label ของวัตถุอื่นในภาพ ซึ่งใช้คิวแยกเหมือน /analyze)
+        fanouts = await asyncio.gather(*[
+            run_language_fanout(text, langs_list, extra=(text not in primary_labels)) for text in unique_labels
+        ])
+        translations: Dict[str, dict] = dict(zip(unique_labels, fanouts))
 
-        return result
+        # บันทึกสถิติการใช้งานของทั้ง batch ในครั้งเดียว
+        await record_usage_stats_bulk(db, [
+            UsageStat(user_email=user_email, language="th", image_class=outcome[1], count=1)
+            for outcome in outcomes if outcome is not None
+        ])
+        record_phrase_usage_background(db, [phrase for fanout in fanouts for phrase in fanout_phrases(fanout)])
+
+        return {"results": items, "labels": translations}
 
     except HTTPException as he:
         logger.error(f"HTTPException: {he.detail}")
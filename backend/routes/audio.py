@@ -0,0 +1,38 @@
+# backend/routes/audio.py
+import asyncio
+import logging
+
+from fastapi import APIRouter, HTTPException, Request
+
+from backend.services.singleflight import AsyncSingleFlight
+from backend.services.static_media import media_response
+from backend.services.tts import synthesize_pending
+from backend.services.tts_cache import tts_cache
+
+router = APIRouter()
+logger = logging.getLogger("audio_routes")
+
+# GET พร้อมกันของไฟล์ที่ยังไม่ถูกสร้างจะรอการสร้างครั้งเดียวกัน
+_on_demand_flight = AsyncSingleFlight("tts_on_demand")
+
+
+@router.api_route("/{filename:path}", methods=["GET", "HEAD"])
+async def get_audio(filename: str, request: Request):
+    """
+    เสิร์ฟไฟล์เสียงจาก cache; ถ้าเป็น URL แบบ lazy ที่ยังไม่ถูกสร้าง จะสร้างตอนนี้แล้วเสิร์ฟ
+    ชื่อไฟล์คือ hash ของเนื้อหา จึงใช้ key เป็น ETag และให้ cache ได้ถาวร
+    """
+    key = tts_cache.key_from_filename(filename)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    path = tts_cache.lookup(key, played=True)
+    if path is None:
+        try:
+            path = await _on_demand_flight.do(key, asyncio.to_thread, synthesize_pending, key)
+        except Exception as e:
+            logger.error(f"สร้างเสียง {key} ไม่สำเร็จ: {e}")
+            raise HTTPException(status_code=502, detail="สร้างไฟล์เสียงไม่สำเร็จ")
+        if path is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        tts_cache.index.touch(key, played=True)
+    return await media_response(request, path, "audio/mpeg", etag=f'"{key}"', immutable=True)
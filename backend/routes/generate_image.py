@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, Security
 from pydantic import BaseModel
-from backend.services.generate_image import generate_image_from_text  # เรียกใช้ฟังก์ชันจริงจาก service
+from backend.services.generate_image import generate_image_assets  # เรียกใช้ฟังก์ชันจริงจาก service
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 import os
@@ -35,7 +35,7 @@ async def generate_image_route(
     if not data.prompt.strip():
         raise HTTPException(status_code=400, detail="Prompt is required")
     try:
-        image_url = await generate_image_from_text(data.prompt)
-        return {"image_url": image_url}
+        assets = await generate_image_assets(data.prompt)
+        return {"image_url": assets["image_url"], "variants": assets["variants"], "cached": assets["cached"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,36 @@
+# backend/routes/health.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from backend.services.model_registry import (
+    ML_ENABLED,
+    MODEL_LOAD_MODE,
+    PRELOAD_MODELS,
+    model_registry,
+)
+from backend.services.inference_executor import inference_executor
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    # โหมด startup: พร้อมเมื่อโมเดลใน PRELOAD_MODELS โหลดเสร็จ, โหมด lazy: พร้อมทันที
+    required = PRELOAD_MODELS if MODEL_LOAD_MODE == "startup" else []
+    body = {
+        "ml_enabled": ML_ENABLED,
+        "load_mode": MODEL_LOAD_MODE,
+    }
+    if inference_executor.kind == "process":
+        # โมเดลอยู่ใน worker process: ใช้สถานะที่ worker แต่ละตัวรายงาน
+        is_ready = inference_executor.workers_ready(required) if required else True
+        body["models"] = {str(pid): status for pid, status in inference_executor.worker_models.items()}
+    else:
+        is_ready = model_registry.is_ready(required) if required else True
+        body["models"] = model_registry.status()
+    body = {"ready": is_ready, **body}
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
@@ -0,0 +1,25 @@
+# backend/routes/images.py
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+
+from backend.services.image_cache import generated_image_cache
+from backend.services.static_media import media_response
+
+router = APIRouter()
+
+
+@router.api_route("/{filename:path}", methods=["GET", "HEAD"])
+async def get_generated_image(filename: str, request: Request):
+    """
+    เสิร์ฟภาพที่สร้างแล้ว (และ variant) จาก cache ชื่อไฟล์มาจาก hash ของ prompt + โมเดล
+    จึงไม่เปลี่ยนเนื้อหา ใช้ชื่อไฟล์เป็น ETag และให้ cache ได้ถาวร
+    """
+    key = generated_image_cache.parse_filename(filename)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    path = await asyncio.to_thread(generated_image_cache.fetch, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    etag = '"' + filename.rsplit("/", 1)[-1].replace(".", "-") + '"'
+    return await media_response(request, path, etag=etag, immutable=True)
@@ -3,6 +3,22 @@ from fastapi import APIRouter, Depends, HTTPException
 from backend.auth.auth_utils import verify_admin_user
 from backend.services.stats_service import get_top_languages, get_image_categories_stats
 from backend.services.admin_service import get_usage_stats_summary
+from backend.services.inference_executor import inference_executor
+from backend.services.batching import batcher_stats
+from backend.services.result_cache import result_cache
+from backend.services.yolo_service import cascade_stats
+from backend.services.auto_mode import auto_stats
+from backend.services.label_pack import label_pack
+from backend.services.translation_cache import translation_cache
+from backend.services.singleflight import singleflight_stats
+from backend.services.translation_providers import translator_stats
+from backend.services.tts_cache import tts_cache
+from backend.services.static_media import media_stats
+from backend.services.blob_storage import blob_storage
+from backend.services.image_cache import generated_image_cache
+from backend.services.tts_warmup import TTS_WARMUP_TOP_N, tts_warmup
+from typing import Optional
+import asyncio
 import logging
 
 router = APIRouter()
@@ -37,3 +53,46 @@ async def image_categories_stats(admin=Depends(verify_admin_user)):
     except Exception as e:
         logger.error(f"Failed to get image categories stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to get image categories stats")
+
+
+@router.get("/runtime")
+async def runtime_stats(admin=Depends(verify_admin_user)):
+    return {
+        "inference_executor": inference_executor.stats(),
+        "batchers": batcher_stats(),
+        "result_cache": result_cache.stats(),
+        "yolo_cascade": cascade_stats.stats(),
+        "auto_mode": auto_stats(),
+        "label_pack": label_pack.stats(),
+        "translation_cache": translation_cache.stats(),
+        "translation_provider": translator_stats(),
+        "singleflight": singleflight_stats(),
+        "tts_cache": tts_cache.stats(),
+        "static_media": media_stats(),
+        "blob_storage": blob_storage.stats(),
+        "generated_images": generated_image_cache.stats(),
+        "tts_warmup": tts_warmup.status(),
+    }
+
+
+@router.delete("/translation-cache")
+async def invalidate_translation_cache(text: Optional[str] = None, target_lang: Optional[str] = None,
+                                       admin=Depends(verify_admin_user)):
+    # ไม่ระบุ text / target_lang = ล้าง cache คำแปลทั้งหมด
+    # worker อื่นจะเลิกใช้คำแปลเดิมเมื่อรายการใน LRU ของตัวเองหมดอายุ (other_workers_stale_for_seconds)
+    result = await asyncio.to_thread(translation_cache.invalidate, text, target_lang)
+    logger.info(f"Translation cache invalidated by {admin.get('email')}: text={text!r} target={target_lang!r} {result}")
+    return result
+
+
+@router.get("/tts-warmup")
+async def tts_warmup_status(admin=Depends(verify_admin_user)):
+    return tts_warmup.status()
+
+
+@router.post("/tts-warmup")
+async def start_tts_warmup(top_n: int = TTS_WARMUP_TOP_N, admin=Depends(verify_admin_user)):
+    # สร้างเสียงของวลียอดนิยมเบื้องหลัง ดูความคืบหน้าได้ที่ GET /stats/tts-warmup
+    started = tts_warmup.start(admin["db"], top_n)
+    logger.info(f"TTS warmup requested by {admin.get('email')}: top_n={top_n} started={started}")
+    return {"started": started, **tts_warmup.status()}
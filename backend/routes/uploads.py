@@ -0,0 +1,27 @@
+# backend/routes/uploads.py
+import asyncio
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+
+from backend.services.blob_storage import NAMESPACE_DIRS, blob_storage
+from backend.services.static_media import media_response
+
+router = APIRouter()
+
+UPLOADS_DIR = NAMESPACE_DIRS["uploads"]
+
+
+@router.api_route("/{filename:path}", methods=["GET", "HEAD"])
+async def get_upload(filename: str, request: Request):
+    root = os.path.realpath(UPLOADS_DIR)
+    path = os.path.realpath(os.path.join(root, filename))
+    # กัน path traversal (../) ออกนอกโฟลเดอร์ uploads
+    if not path.startswith(root + os.sep):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not os.path.isfile(path):
+        # อาจถูกอัปโหลดผ่านเครื่องอื่น: ดึงจาก blob storage มาไว้ local ก่อน (read-through)
+        path = await asyncio.to_thread(blob_storage.fetch, "uploads", os.path.relpath(path, root))
+        if path is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+    return await media_response(request, path)
@@ -0,0 +1,100 @@
+# backend/scripts/benchmark_blip.py
+"""
+เปรียบเทียบ latency และความตรงกันของ caption ระหว่าง BLIP runtime profile ต่าง ๆ กับ fp32 baseline
+
+    python -m backend.scripts.benchmark_blip --limit 32 --threads 4
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from PIL import Image
+
+from backend.services.blip_runtime import BlipRuntimeProfile, generate_captions, load_blip
+from backend.services.image_ingest import decode_image
+
+DEFAULT_IMAGES = os.path.join("yolo_train", "coco128", "images", "train2017")
+
+
+def token_overlap(a: str, b: str) -> float:
+    tokens_a, tokens_b = set(a.lower().split()), set(b.lower().split())
+    if not tokens_a and not tokens_b:
+        return 1.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+def run_profile(name: str, model_name: str, profile: BlipRuntimeProfile, images: List[Image.Image], warmup: int) -> Dict:
+    started = time.perf_counter()
+    loaded = load_blip(model_name, profile)
+    load_seconds = time.perf_counter() - started
+
+    for image in images[:warmup]:
+        generate_captions(loaded, [image], profile)
+
+    captions, latencies = [], []
+    for image in images:
+        t0 = time.perf_counter()
+        captions.append(generate_captions(loaded, [image], profile)[0])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    latencies.sort()
+    return {
+        "name": name,
+        "load_s": load_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "captions": captions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BLIP CPU runtime profiles")
+    parser.add_argument("--model", default=os.getenv("BLIP_MODEL_NAME", "Salesforce/blip-image-captioning-base"))
+    parser.add_argument("--images", default=DEFAULT_IMAGES)
+    parser.add_argument("--limit", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = ค่าเริ่มต้นของ torch)")
+    parser.add_argument("--max-new-tokens", type=int, default=30)
+    parser.add_argument("--beams", type=int, default=1)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jpg")))[:args.limit]
+    if not paths:
+        raise SystemExit(f"No images found in {args.images}")
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(decode_image(f.read(), ["blip"]))
+
+    bounded = dict(num_threads=args.threads, max_new_tokens=args.max_new_tokens, num_beams=args.beams)
+    profiles = [
+        ("fp32 baseline", BlipRuntimeProfile(num_threads=args.threads, max_new_tokens=0)),
+        ("fp32 bounded", BlipRuntimeProfile(**bounded)),
+        ("int8 dynamic", BlipRuntimeProfile(quantize="int8", **bounded)),
+        ("bf16", BlipRuntimeProfile(dtype="bf16", **bounded)),
+    ]
+
+    results = []
+    for name, profile in profiles:
+        try:
+            results.append(run_profile(name, args.model, profile, images, args.warmup))
+        except Exception as e:
+            print(f"{name}: failed ({e})")
+    if not results:
+        raise SystemExit("All profiles failed")
+
+    baseline = results[0]["captions"]
+    print(f"{len(images)} images from {args.images}")
+    print(f"{'profile':<16}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'exact':>8}{'overlap':>9}")
+    for result in results:
+        exact = sum(a == b for a, b in zip(result["captions"], baseline)) / len(images)
+        overlap = statistics.mean(token_overlap(a, b) for a, b in zip(result["captions"], baseline))
+        print(f"{result['name']:<16}{result['load_s']:>8.2f}{result['p50_ms']:>9.1f}"
+              f"{result['p95_ms']:>9.1f}{exact:>8.1%}{overlap:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# backend/scripts/benchmark_yolo.py
+"""
+เปรียบเทียบ latency และ top-1 agreement ของ YOLO backend ต่าง ๆ บนภาพใน yolo_train/coco128
+
+    python -m backend.scripts.benchmark_yolo --backends pytorch onnx openvino torchscript --int8
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from backend.services.image_ingest import decode_image
+from backend.services.yolo_backends import SUPPORTED_BACKENDS, load_yolo_model
+
+DEFAULT_IMAGES = os.path.join("yolo_train", "coco128", "images", "train2017")
+
+
+def top1_label(model, image) -> Optional[str]:
+    results = model(image, verbose=False)[0]
+    if len(results.boxes) == 0:
+        return None
+    best = int(results.boxes.conf.argmax())
+    return model.names[int(results.boxes.cls[best])]
+
+
+def run_backend(backend: str, weights: str, int8: bool, images: List[Image.Image], warmup: int) -> Dict:
+    started = time.perf_counter()
+    model = load_yolo_model(weights, backend=backend, int8=int8)
+    load_seconds = time.perf_counter() - started
+
+    for image in images[:warmup]:
+        top1_label(model, image)
+
+    labels, latencies = [], []
+    for image in images:
+        t0 = time.perf_counter()
+        labels.append(top1_label(model, image))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    latencies.sort()
+    return {
+        "backend": backend + (" int8" if int8 and backend != "pytorch" else ""),
+        "load_s": load_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "mean_ms": statistics.mean(latencies),
+        "labels": labels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO inference backends")
+    parser.add_argument("--weights", default=os.getenv("YOLO_MODEL_PATH", "yolov8s.pt"))
+    parser.add_argument("--backends", nargs="+", default=list(SUPPORTED_BACKENDS), choices=SUPPORTED_BACKENDS)
+    parser.add_argument("--int8", action="store_true", help="ใช้โมเดล INT8 สำหรับ backend ที่รองรับ")
+    parser.add_argument("--images", default=DEFAULT_IMAGES)
+    parser.add_argument("--limit", type=int, default=128)
+    parser.add_argument("--warmup", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jpg")))[:args.limit]
+    if not paths:
+        raise SystemExit(f"No images found in {args.images}")
+    # ใช้ขั้นตอน ingest เดียวกับ /analyze
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(decode_image(f.read(), ["yolo"]))
+
+    baseline = run_backend("pytorch", args.weights, False, images, args.warmup)
+    results = [baseline]
+    for backend in args.backends:
+        if backend == "pytorch":
+            continue
+        try:
+            results.append(run_backend(backend, args.weights, args.int8, images, args.warmup))
+        except Exception as e:
+            print(f"{backend}: failed ({e})")
+
+    print(f"{len(images)} images from {args.images}")
+    print(f"{'backend':<20}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}{'top-1 agree':>13}")
+    for result in results:
+        agree = sum(a == b for a, b in zip(result["labels"], baseline["labels"])) / len(images)
+        print(f"{result['backend']:<20}{result['load_s']:>8.2f}{result['p50_ms']:>9.1f}"
+              f"{result['p95_ms']:>9.1f}{result['mean_ms']:>9.1f}{agree:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
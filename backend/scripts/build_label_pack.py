@@ -0,0 +1,145 @@
+# backend/scripts/build_label_pack.py
+"""
+สร้าง label pack: แปล + สร้างไฟล์เสียงของทุก class ของ YOLO x ภาษาไทยและทุกภาษาใน backend/config/languages.py
+
+    python -m backend.scripts.build_label_pack --version 2024-06-01
+    python -m backend.scripts.build_label_pack --version 2024-06-01 --include-misses
+
+pack ของ version เดิมที่มีอยู่แล้วจะถูกใช้ซ้ำ (build ต่อเฉพาะ entry ที่ขาด) แล้วชี้ current.json ไปที่ version นี้
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from gtts import gTTS
+
+from backend.config.languages import languages
+from backend.services.label_pack import (
+    CURRENT_NAME,
+    LABEL_PACK_DIR,
+    MANIFEST_NAME,
+    MISSES_NAME,
+    version_dir,
+    write_json_atomic,
+)
+from backend.services.translate import translate_text
+
+
+def load_class_names(weights: str) -> List[str]:
+    from ultralytics import YOLO
+
+    names = YOLO(weights).names
+    return [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+
+
+def read_misses(base_dir: str) -> List[Tuple[str, str]]:
+    path = os.path.join(base_dir, MISSES_NAME)
+    if not os.path.exists(path):
+        return []
+    misses = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+                misses.append((item["label"], item["lang_code"]))
+            except (ValueError, KeyError):
+                continue
+    return misses
+
+
+def read_manifest(path: str) -> Dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def audio_filename(label: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", label.lower()).strip("_")
+    return f"{slug or 'label'}.mp3"
+
+
+def build_entry(label: str, lang_code: str, out_dir: str) -> Dict[str, str]:
+    translated = translate_text(label, lang_code)
+    relative = os.path.join("audio", lang_code, audio_filename(label)).replace(os.sep, "/")
+    path = os.path.join(out_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    gTTS(translated, lang=lang_code).save(tmp_path)
+    os.replace(tmp_path, path)
+    return {"translated": translated, "audio": relative}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed multilingual label pack")
+    parser.add_argument("--weights", default=os.getenv("YOLO_MODEL_PATH", "yolov8s.pt"))
+    parser.add_argument("--version", default=datetime.utcnow().strftime("%Y%m%d"))
+    parser.add_argument("--out", default=LABEL_PACK_DIR)
+    parser.add_argument("--languages", nargs="+", default=None,
+                        help="รหัสภาษา (ค่าเริ่มต้น: th + ทุกภาษาใน config)")
+    parser.add_argument("--include-misses", action="store_true",
+                        help="เติม label/ภาษาที่ถูกบันทึกใน misses.jsonl ระหว่างใช้งานจริง")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--no-activate", action="store_true", help="ไม่ต้องชี้ current.json ไปที่ version นี้")
+    args = parser.parse_args()
+
+    lang_codes = args.languages or ["th"] + sorted(set(languages.values()))
+    labels = load_class_names(args.weights)
+    wanted = [(label, code) for label in labels for code in lang_codes]
+    if args.include_misses:
+        wanted += read_misses(args.out)
+    wanted = list(dict.fromkeys(wanted))
+
+    out_dir = version_dir(args.version, args.out)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    entries: Dict[str, Dict[str, Dict[str, str]]] = read_manifest(manifest_path).get("entries", {})
+
+    todo = [
+        (label, code) for label, code in wanted
+        if not (code in entries.get(label, {})
+                and os.path.exists(os.path.join(out_dir, entries[label][code]["audio"])))
+    ]
+    print(f"{len(wanted)} entries ({len(labels)} classes x {len(lang_codes)} languages), {len(todo)} to build")
+
+    started = time.perf_counter()
+    failed: List[Tuple[str, str, Optional[str]]] = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(build_entry, label, code, out_dir): (label, code) for label, code in todo}
+        for done, future in enumerate(as_completed(futures), start=1):
+            label, code = futures[future]
+            try:
+                entries.setdefault(label, {})[code] = future.result()
+            except Exception as e:
+                failed.append((label, code, str(e)))
+            if done % 50 == 0 or done == len(futures):
+                print(f"  {done}/{len(futures)} ({time.perf_counter() - started:.0f}s)")
+
+    all_codes = sorted({code for per_lang in entries.values() for code in per_lang})
+    write_json_atomic(manifest_path, {
+        "version": args.version,
+        "model": os.path.basename(args.weights),
+        "built_at": datetime.utcnow().isoformat(),
+        "languages": all_codes,
+        "classes": labels,
+        "entries": entries,
+    })
+    if not args.no_activate:
+        write_json_atomic(os.path.join(args.out, CURRENT_NAME), {"version": args.version})
+
+    print(f"label pack {args.version}: {sum(len(v) for v in entries.values())} entries -> {out_dir}")
+    if failed:
+        # entry ที่ล้มเหลวจะถูกแปลแบบ live ระหว่างใช้งานและบันทึกเป็น miss ให้ build ครั้งถัดไป
+        print(f"{len(failed)} entries failed:")
+        for label, code, error in failed[:20]:
+            print(f"  {label} [{code}]: {error}")
+
+
+if __name__ == "__main__":
+    main()
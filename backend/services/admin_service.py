@@ -3,6 +3,7 @@ import logging
 from typing import Optional, List, Dict, Any, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import UpdateOne
 from datetime import datetime
 from backend.models.admin_models import UsageStat
 
@@ -93,6 +94,30 @@ async def record_usage_stat(db: AsyncIOMotorDatabase, stat: UsageStat) -> None:
         await db.usage_stats.insert_one(data)
 
 
+async def record_usage_stats_bulk(db: AsyncIOMotorDatabase, stats: List[UsageStat]) -> None:
+    """
+    บันทึก usage stats หลายรายการด้วย bulk write ครั้งเดียว (รวม count ของ key เดียวกันก่อน)
+    """
+    grouped: Dict[Tuple[str, str, str], int] = {}
+    for stat in stats:
+        key = (stat.user_email, stat.language, stat.image_class)
+        grouped[key] = grouped.get(key, 0) + stat.count
+    if not grouped:
+        return
+
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"user_email": user_email, "language": language, "image_class": image_class},
+            {"$inc": {"count": count}, "$set": {"last_used": now}},
+            upsert=True,
+        )
+        for (user_email, language, image_class), count in grouped.items()
+    ]
+    result = await db.usage_stats.bulk_write(operations, ordered=False)
+    logger.info(f"Bulk recorded usage stats: {len(operations)} keys, upserted={result.upserted_count}, modified={result.modified_count}")
+
+
 async def get_usage_stats_summary(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
     pipeline = [{"$group": {"_id": "$user_email", "total_count": {"$sum": "$count"}, "last_used": {"$max": "$last_used"}}}]
     cursor = db.usage_stats.aggregate(pipeline)
@@ -0,0 +1,70 @@
+# backend/services/auto_mode.py
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from backend.services.blip_service import describe_image_async, describe_images_async
+from backend.services.metrics import Counters
+from backend.services.yolo_service import detect_detection_async, detect_detections_async
+
+logger = logging.getLogger("auto_mode")
+
+# ใช้ผล YOLO เมื่อกล่องที่ดีที่สุดมั่นใจอย่างน้อย AUTO_MIN_CONFIDENCE และภาพมีไม่เกิน AUTO_MAX_CLASSES class
+AUTO_MIN_CONFIDENCE = float(os.getenv("AUTO_MIN_CONFIDENCE", "0.6"))
+AUTO_MAX_CLASSES = int(os.getenv("AUTO_MAX_CLASSES", "2"))
+
+auto_counters = Counters("requests", "yolo", "blip")
+
+
+def needs_caption(detection: Optional[Dict]) -> bool:
+    """
+    ไม่พบวัตถุที่มั่นใจ หรือฉากรกเกินไป → ให้ BLIP บรรยายภาพแทน
+    """
+    if detection is None:
+        return True
+    return detection["confidence"] < AUTO_MIN_CONFIDENCE or detection["num_classes"] > AUTO_MAX_CLASSES
+
+
+async def analyze_auto(image) -> Tuple[str, str, List[Dict]]:
+    """
+    รัน YOLO ก่อน แล้วค่อย fallback ไป BLIP เมื่อจำเป็น คืนค่า (label, answered_by, objects)
+    """
+    auto_counters.inc("requests")
+    detection = await detect_detection_async(image)
+    if not needs_caption(detection):
+        auto_counters.inc("yolo")
+        return detection["label"], "yolo", detection["objects"]
+    auto_counters.inc("blip")
+    return await describe_image_async(image), "blip", []
+
+
+async def analyze_auto_batch(images) -> List[Tuple[Optional[str], str, List[Dict]]]:
+    """
+    เหมือน analyze_auto สำหรับหลายภาพ คืนค่า (label, answered_by, objects) ตามลำดับภาพ
+    """
+    images = list(images)
+    auto_counters.inc("requests", len(images))
+    detections = await detect_detections_async(images)
+    outcomes: List[Tuple[Optional[str], str, List[Dict]]] = [(None, "yolo", [])] * len(images)
+    fallback = []
+    for i, detection in enumerate(detections):
+        if needs_caption(detection):
+            fallback.append(i)
+        else:
+            outcomes[i] = (detection["label"], "yolo", detection["objects"])
+    auto_counters.inc("yolo", len(images) - len(fallback))
+    auto_counters.inc("blip", len(fallback))
+    if fallback:
+        captions = await describe_images_async([images[i] for i in fallback])
+        for i, caption in zip(fallback, captions):
+            outcomes[i] = (caption, "blip", [])
+    return outcomes
+
+
+def auto_stats() -> Dict:
+    requests = auto_counters.get("requests")
+    return auto_counters.snapshot({
+        "blip_share": round(auto_counters.get("blip") / requests, 4) if requests else 0.0,
+        "min_confidence": AUTO_MIN_CONFIDENCE,
+        "max_classes": AUTO_MAX_CLASSES,
+    })
@@ -0,0 +1,110 @@
+# backend/services/batching.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from backend.services.metrics import Counters, Histogram
+
+logger = logging.getLogger("batching")
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+WAIT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+_batchers: Dict[str, "MicroBatcher"] = {}
+
+
+class MicroBatcher:
+    """
+    รวม request ที่เข้ามาพร้อม ๆ กันเป็น batch เดียว (สูงสุด max_batch_size รายการ หรือรอไม่เกิน max_wait_ms)
+    แล้วเรียก batch_fn ครั้งเดียว ผลลัพธ์ที่ได้ต้องเป็น list ที่เรียงตามลำดับ input
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_batch_size: int, max_wait_ms: float):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.counters = Counters("items", "batches", "failed_batches")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # task ของ batch ที่กำลังรัน (เก็บ reference ไว้ไม่ให้ถูก garbage collect ระหว่างรัน)
+        self._batch_tasks: Set[asyncio.Task] = set()
+        _batchers[name] = self
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._collect())
+        return self._queue
+
+    async def submit(self, item: Any) -> Any:
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> None:
+        queue = self._queue
+        while True:
+            first = await queue.get()
+            batch: List[Tuple[Any, asyncio.Future, float]] = [first]
+            deadline = time.perf_counter() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            # รัน batch แยก task เพื่อให้เก็บ batch ถัดไปได้ระหว่างรอ inference
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: "asyncio.Task") -> None:
+        self._batch_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Batch {self.name} task crashed: {task.exception()}")
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        dispatched = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.wait_ms.observe((dispatched - enqueued) * 1000)
+        self.counters.inc("items", len(batch))
+        self.counters.inc("batches")
+        try:
+            results = await self.batch_fn([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            self.counters.inc("failed_batches")
+            logger.error(f"Batch {self.name} failed ({len(batch)} items): {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.counters.snapshot({
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "inflight_batches": len(self._batch_tasks),
+            "batch_size": self.batch_size.snapshot(),
+            "wait_ms": self.wait_ms.snapshot(),
+        })
+
+
+def batcher_stats() -> Dict[str, Any]:
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
@@ -0,0 +1,111 @@
+# backend/services/blip_runtime.py
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("blip_runtime")
+
+
+class BlipRuntimeProfile:
+    """
+    การตั้งค่า runtime ของ BLIP บน CPU: quantization, dtype, จำนวน thread และขอบเขตการ generate
+    """
+
+    def __init__(self, quantize: str = "none", dtype: str = "fp32", num_threads: int = 0,
+                 max_new_tokens: int = 0, num_beams: int = 1):
+        if quantize not in ("none", "int8"):
+            raise ValueError(f"Unsupported BLIP_QUANTIZE: {quantize}")
+        if dtype not in ("fp32", "bf16"):
+            raise ValueError(f"Unsupported BLIP_DTYPE: {dtype}")
+        if quantize == "int8" and dtype == "bf16":
+            raise ValueError("BLIP_QUANTIZE=int8 cannot be combined with BLIP_DTYPE=bf16")
+        self.quantize = quantize
+        self.dtype = dtype
+        self.num_threads = num_threads
+        self.max_new_tokens = max_new_tokens
+        self.num_beams = max(1, num_beams)
+
+    @classmethod
+    def from_env(cls) -> "BlipRuntimeProfile":
+        return cls(
+            quantize=os.getenv("BLIP_QUANTIZE", "none").lower(),
+            dtype=os.getenv("BLIP_DTYPE", "fp32").lower(),
+            num_threads=int(os.getenv("BLIP_NUM_THREADS", "0")),
+            max_new_tokens=int(os.getenv("BLIP_MAX_NEW_TOKENS", "0")),
+            num_beams=int(os.getenv("BLIP_NUM_BEAMS", "1")),
+        )
+
+    def generation_kwargs(self) -> Dict[str, Any]:
+        # ค่าเริ่มต้น (max_new_tokens <= 0, num_beams = 1) = ใช้ค่า generate() ของโมเดล (max_length=20 เหมือนเดิม)
+        # ตั้ง BLIP_MAX_NEW_TOKENS ให้ต่ำกว่านั้นเพื่อให้ caption สั้นและเร็วขึ้น
+        kwargs: Dict[str, Any] = {}
+        if self.max_new_tokens > 0:
+            kwargs.update({"max_new_tokens": self.max_new_tokens, "do_sample": False})
+        if self.num_beams > 1:
+            kwargs["num_beams"] = self.num_beams
+        return kwargs
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "quantize": self.quantize,
+            "dtype": self.dtype,
+            "num_threads": self.num_threads,
+            **self.generation_kwargs(),
+        }
+
+
+def apply_thread_limits(num_threads: int) -> None:
+    """
+    จำกัด intra-op thread ของ torch ต่อ worker เพื่อไม่ให้หลาย uvicorn worker แย่ง core กัน
+    """
+    if num_threads <= 0:
+        return
+    import torch
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # ตั้งได้ครั้งเดียวก่อนเริ่มงาน parallel แรกเท่านั้น
+        pass
+
+
+def load_blip(model_name: str, profile: Optional[BlipRuntimeProfile] = None) -> Tuple[Any, Any, str, Any]:
+    """
+    โหลด processor + model ตาม profile คืนค่า (processor, model, device, input_dtype)
+    """
+    import torch
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+
+    profile = profile or BlipRuntimeProfile.from_env()
+    apply_thread_limits(profile.num_threads)
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    blip_processor = BlipProcessor.from_pretrained(model_name)
+    blip_model = BlipForConditionalGeneration.from_pretrained(model_name)
+    blip_model.eval()
+    input_dtype = torch.float32
+
+    if profile.quantize == "int8":
+        if device != "cpu":
+            logger.warning("Dynamic INT8 quantization is CPU only; running BLIP on CPU")
+            device = "cpu"
+        blip_model = torch.quantization.quantize_dynamic(blip_model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif profile.dtype == "bf16":
+        blip_model = blip_model.to(torch.bfloat16)
+        input_dtype = torch.bfloat16
+
+    blip_model = blip_model.to(device)
+    logger.info(f"BLIP loaded on {device} with profile {profile.describe()}")
+    return blip_processor, blip_model, device, input_dtype
+
+
+def generate_captions(loaded, images, profile: BlipRuntimeProfile):
+    import torch
+
+    blip_processor, blip_model, device, input_dtype = loaded
+    inputs = blip_processor(images=images, return_tensors="pt").to(device)
+    inputs["pixel_values"] = inputs["pixel_values"].to(input_dtype)
+    with torch.inference_mode():
+        out = blip_model.generate(**inputs, **profile.generation_kwargs())
+    return blip_processor.batch_decode(out, skip_special_tokens=True)
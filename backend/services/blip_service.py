@@ -1,13 +1,63 @@
-import torch
-from transformers import BlipProcessor, BlipForConditionalGeneration
+import asyncio
+import os
+from PIL import Image
+from backend.services.batching import MicroBatcher
+from backend.services.blip_runtime import BlipRuntimeProfile, generate_captions, load_blip
+from backend.services.inference_executor import run_inference
+from backend.services.model_registry import model_registry
+
+BLIP_MODEL_NAME = os.getenv("BLIP_MODEL_NAME", "Salesforce/blip-image-captioning-base")
+
+# รวมภาพเป็น batch ได้สูงสุด BLIP_BATCH_SIZE ภาพ หรือรอไม่เกิน BLIP_BATCH_WAIT_MS (1 = ปิด batching)
+BLIP_BATCH_SIZE = int(os.getenv("BLIP_BATCH_SIZE", "4"))
+BLIP_BATCH_WAIT_MS = float(os.getenv("BLIP_BATCH_WAIT_MS", "20"))
+
+blip_profile = BlipRuntimeProfile.from_env()
+
+
+def _load_blip():
+    # import torch / transformers เฉพาะตอนโหลดโมเดลจริง (ตาม BLIP runtime profile)
+    return load_blip(BLIP_MODEL_NAME, blip_profile)
+
+
+def _warmup_blip(loaded):
+    generate_captions(loaded, [Image.new("RGB", (384, 384))], blip_profile)
+
+
+model_registry.register("blip", _load_blip, _warmup_blip)
+
+
+def describe_images(images):
+    # processor + generate ครั้งเดียวสำหรับทุกภาพ แล้วแยก caption กลับตามลำดับ
+    return generate_captions(model_registry.get("blip"), images, blip_profile)
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-blip_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base").to(device)
-blip_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
 
 def describe_image(image):
-    inputs = blip_processor(image, return_tensors="pt").to(device)
-    out = blip_model.generate(**inputs)
-    return blip_processor.decode(out[0], skip_special_tokens=True)
+    return describe_images([image])[0]
+
+
+async def _run_blip_batch(images):
+    return await run_inference(describe_images, images)
+
+
+blip_batcher = MicroBatcher("blip", _run_blip_batch, BLIP_BATCH_SIZE, BLIP_BATCH_WAIT_MS)
+
+
+async def describe_image_async(image):
+    # รันใน inference executor เพื่อไม่ให้บล็อก event loop
+    if BLIP_BATCH_SIZE > 1:
+        return await blip_batcher.submit(image)
+    return await run_inference(describe_image, image)
+
+
+async def describe_images_async(images):
+    # ภาพหลายภาพจาก request เดียว ส่งตรงเป็น batch ละไม่เกิน BLIP_BATCH_SIZE ภาพ
+    images = list(images)
+    step = max(1, BLIP_BATCH_SIZE)
+    chunks = await asyncio.gather(*[
+        run_inference(describe_images, images[i:i + step]) for i in range(0, len(images), step)
+    ])
+    return [label for chunk in chunks for label in chunk]
+
 # backend/services/blip_service.py
-# This service uses the BLIP model to generate image descriptions.
\ No newline at end of file
+# This service uses the BLIP model to generate image descriptions.
@@ -0,0 +1,294 @@
+# backend/services/blob_storage.py
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services.metrics import Counters
+
+logger = logging.getLogger("blob_storage")
+
+# local = ไฟล์อยู่บนดิสก์ของเครื่องนี้เท่านั้น (ค่าเดิม)
+# s3 = เก็บใน S3 หรือบริการที่เข้ากันได้ (MinIO) แล้วใช้โฟลเดอร์ local เป็น read-through cache
+BLOB_BACKEND = os.getenv("BLOB_BACKEND", "local").lower()
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # เช่น http://localhost:9000 สำหรับ MinIO
+S3_REGION = os.getenv("S3_REGION", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "snaptranslate/")
+# งบของ read-through cache (ไบต์) สำหรับ namespace ที่ไม่มีการจัดการขนาดของตัวเอง
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# namespace -> โฟลเดอร์ local (เป็นที่เก็บหลักเมื่อ backend=local และเป็น cache เมื่อ backend=s3)
+NAMESPACE_DIRS = {
+    "tts": os.getenv("TTS_CACHE_DIR", "tts_cache"),
+    "uploads": "uploads",
+    "images": "output",
+}
+# namespace ที่คุมขนาดเองอยู่แล้ว (tts_cache มี janitor, ภาพที่สร้างมีงบของ image_cache)
+SELF_MANAGED_NAMESPACES = {"tts", "images"}
+
+
+class BlobBackend:
+    """
+    interface ของที่เก็บ blob ระยะยาว: key อยู่ในรูป "<namespace>/<path>"
+    """
+
+    name = "base"
+    remote = False
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def download(self, key: str, dest_path: str) -> bool:
+        raise NotImplementedError
+
+    def upload(self, key: str, src_path: str, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class LocalBackend(BlobBackend):
+    """
+    ไม่มีที่เก็บภายนอก: ไฟล์ใน NAMESPACE_DIRS คือสำเนาเดียว (ทุกเมธอดเป็น no-op)
+    """
+
+    name = "local"
+
+    def exists(self, key: str) -> bool:
+        return False
+
+    def download(self, key: str, dest_path: str) -> bool:
+        return False
+
+    def upload(self, key: str, src_path: str, content_type: Optional[str] = None) -> None:
+        pass
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        pass
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        return None
+
+    def delete(self, key: str) -> None:
+        pass
+
+
+class S3Backend(BlobBackend):
+    name = "s3"
+    remote = True
+
+    def __init__(self, bucket: str = S3_BUCKET, endpoint_url: str = S3_ENDPOINT_URL,
+                 region: str = S3_REGION, prefix: str = S3_PREFIX):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("BLOB_BACKEND=s3 ต้องติดตั้ง boto3 (pip install boto3)") from e
+        if not bucket:
+            raise RuntimeError("BLOB_BACKEND=s3 ต้องกำหนด S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client_error = ClientError
+        # credential อ่านจาก AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY ตามปกติของ boto3
+        self._client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _is_not_found(self, error: Exception) -> bool:
+        code = str(getattr(error, "response", {}).get("Error", {}).get("Code", ""))
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except self._client_error as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    def download(self, key: str, dest_path: str) -> bool:
+        try:
+            self._client.download_file(self.bucket, self._object_key(key), dest_path)
+            return True
+        except self._client_error as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    def upload(self, key: str, src_path: str, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else None
+        self._client.upload_file(src_path, self.bucket, self._object_key(key), ExtraArgs=extra)
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        kwargs: Dict[str, Any] = {"Bucket": self.bucket, "Key": self._object_key(key), "Body": data}
+        if content_type:
+            kwargs["ContentType"] = content_type
+        self._client.put_object(**kwargs)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"].read()
+        except self._client_error as e:
+            if self._is_not_found(e):
+                return None
+            raise
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+class BlobStorage:
+    """
+    จุดเดียวที่ service ใช้อ่าน/เขียนไฟล์ที่ต้องแชร์ระหว่างเครื่อง:
+    เขียนลงโฟลเดอร์ local ก่อนเสมอ แล้ว publish ขึ้น backend; อ่านจาก local ถ้ามี ไม่เช่นนั้นดึงจาก backend
+    (read-through) และจำกัดขนาดของสำเนา local ด้วย LRU ตาม BLOB_CACHE_MAX_BYTES
+    """
+
+    def __init__(self, backend: BlobBackend, max_cache_bytes: int = BLOB_CACHE_MAX_BYTES):
+        self.backend = backend
+        self.max_cache_bytes = max_cache_bytes
+        self._cached: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = Counters(
+            "local_hits", "remote_hits", "remote_misses", "remote_errors",
+            "published", "publish_errors", "evictions",
+        )
+
+    @property
+    def remote(self) -> bool:
+        return self.backend.remote
+
+    def local_path(self, namespace: str, path: str) -> str:
+        return os.path.join(NAMESPACE_DIRS[namespace], path)
+
+    def _track(self, namespace: str, path: str) -> None:
+        # namespace ที่คุมขนาดเองหรือ backend=local (local คือสำเนาหลัก) ไม่ถูกลบโดย cache นี้
+        if not self.remote or namespace in SELF_MANAGED_NAMESPACES:
+            return
+        local_path = self.local_path(namespace, path)
+        try:
+            size = os.path.getsize(local_path)
+        except OSError:
+            return
+        doomed = []
+        with self._lock:
+            key = (namespace, path)
+            self._cached_bytes -= self._cached.pop(key, 0)
+            self._cached[key] = size
+            self._cached_bytes += size
+            while self._cached_bytes > self.max_cache_bytes and len(self._cached) > 1:
+                old_key, old_size = self._cached.popitem(last=False)
+                self._cached_bytes -= old_size
+                doomed.append(old_key)
+        for old_namespace, old_path in doomed:
+            try:
+                os.remove(self.local_path(old_namespace, old_path))
+                self.counters.inc("evictions")
+            except OSError:
+                pass
+
+    def fetch(self, namespace: str, path: str) -> Optional[str]:
+        """
+        คืน path ของไฟล์บนดิสก์ local (ดึงจาก backend มาก่อนถ้าจำเป็น) หรือ None ถ้าไม่มีที่ไหนเลย
+        """
+        local_path = self.local_path(namespace, path)
+        if os.path.exists(local_path):
+            self.counters.inc("local_hits")
+            if self.remote and namespace not in SELF_MANAGED_NAMESPACES:
+                with self._lock:
+                    if (namespace, path) in self._cached:
+                        self._cached.move_to_end((namespace, path))
+            return local_path
+        if not self.remote:
+            return None
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        tmp_path = f"{local_path}.{os.getpid()}.{threading.get_ident()}.download"
+        try:
+            found = self.backend.download(f"{namespace}/{path}", tmp_path)
+        except Exception as e:
+            self.counters.inc("remote_errors")
+            logger.error(f"ดึง {namespace}/{path} จาก {self.backend.name} ไม่สำเร็จ: {e}")
+            found = False
+        if not found:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.counters.inc("remote_misses")
+            return None
+        os.replace(tmp_path, local_path)
+        self.counters.inc("remote_hits")
+        self._track(namespace, path)
+        return local_path
+
+    def publish(self, namespace: str, path: str, content_type: Optional[str] = None) -> None:
+        """
+        ส่งไฟล์ที่เพิ่งเขียนลง local ขึ้น backend ให้เครื่องอื่นใช้ได้ (ไม่ล้ม request ถ้า upload ไม่สำเร็จ)
+        """
+        if not self.remote:
+            return
+        try:
+            self.backend.upload(f"{namespace}/{path}", self.local_path(namespace, path), content_type)
+            self.counters.inc("published")
+        except Exception as e:
+            self.counters.inc("publish_errors")
+            logger.error(f"ส่ง {namespace}/{path} ขึ้น {self.backend.name} ไม่สำเร็จ: {e}")
+        self._track(namespace, path)
+
+    def put_bytes(self, namespace: str, path: str, data: bytes, content_type: Optional[str] = None) -> None:
+        if not self.remote:
+            return
+        try:
+            self.backend.put_bytes(f"{namespace}/{path}", data, content_type)
+        except Exception as e:
+            self.counters.inc("publish_errors")
+            logger.error(f"เขียน {namespace}/{path} ขึ้น {self.backend.name} ไม่สำเร็จ: {e}")
+
+    def get_bytes(self, namespace: str, path: str) -> Optional[bytes]:
+        if not self.remote:
+            return None
+        try:
+            return self.backend.get_bytes(f"{namespace}/{path}")
+        except Exception as e:
+            self.counters.inc("remote_errors")
+            logger.error(f"อ่าน {namespace}/{path} จาก {self.backend.name} ไม่สำเร็จ: {e}")
+            return None
+
+    def delete(self, namespace: str, path: str) -> None:
+        if self.remote:
+            try:
+                self.backend.delete(f"{namespace}/{path}")
+            except Exception as e:
+                self.counters.inc("remote_errors")
+                logger.error(f"ลบ {namespace}/{path} จาก {self.backend.name} ไม่สำเร็จ: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached, cached_bytes = len(self._cached), self._cached_bytes
+        return self.counters.snapshot({
+            "backend": self.backend.name,
+            "read_through_entries": cached,
+            "read_through_bytes": cached_bytes,
+            "read_through_max_bytes": self.max_cache_bytes,
+        })
+
+
+def _create_backend() -> BlobBackend:
+    if BLOB_BACKEND == "s3":
+        return S3Backend()
+    if BLOB_BACKEND != "local":
+        logger.warning(f"ไม่รู้จัก BLOB_BACKEND={BLOB_BACKEND} ใช้ local แทน")
+    return LocalBackend()
+
+
+blob_storage = BlobStorage(_create_backend())
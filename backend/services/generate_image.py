@@ -1,8 +1,11 @@
 import os
 import requests
 import asyncio
+from typing import Any, Dict
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
+from backend.services.image_cache import generated_image_cache, image_key, normalize_prompt
+from backend.services.singleflight import AsyncSingleFlight
+from backend.services.translate import translate_text_async
 
 load_dotenv()
 
@@ -13,8 +16,12 @@ headers = {
     "Authorization": f"Bearer {HF_API_TOKEN}"
 }
 
-def translate_to_english(text: str) -> str:
-    return GoogleTranslator(source='auto', target='en').translate(text)
+# prompt เดียวกันที่ถูกขอพร้อมกันจะเรียก Hugging Face เพียงครั้งเดียว
+_generate_flight = AsyncSingleFlight("generate_image")
+
+
+async def translate_to_english(text: str) -> str:
+    return await translate_text_async(text, "en")
 
 def sync_generate_image_from_text(prompt: str) -> bytes:
     api_url = f"https://api-inference.huggingface.co/models/{MODEL_NAME}"
@@ -24,17 +31,32 @@ def sync_generate_image_from_text(prompt: str) -> bytes:
         raise Exception(f"HuggingFace API Error: {response.status_code} - {response.text}")
     return response.content
 
-async def generate_image_from_text(user_prompt: str) -> str:
-    try:
-        prompt_en = translate_to_english(user_prompt)
-        image_bytes = await asyncio.to_thread(sync_generate_image_from_text, prompt_en)
 
-        os.makedirs("output", exist_ok=True)
-        output_path = "output/generated.png"
-        with open(output_path, "wb") as f:
-            f.write(image_bytes)
+async def _generate_and_store(key: str, prompt_en: str) -> None:
+    # อาจถูกสร้างไว้แล้ว (โดยเครื่องอื่นหรือ request ก่อนหน้า) ระหว่างรอ
+    if await asyncio.to_thread(generated_image_cache.lookup, key):
+        return
+    image_bytes = await asyncio.to_thread(sync_generate_image_from_text, prompt_en)
+    await asyncio.to_thread(generated_image_cache.store, key, image_bytes)
+
 
-        return output_path
+async def generate_image_assets(user_prompt: str) -> Dict[str, Any]:
+    """
+    แปล prompt เป็นภาษาอังกฤษ แล้วใช้ภาพใน cache ถ้ามี (key = hash ของ prompt + โมเดล)
+    ไม่เช่นนั้นเรียก Hugging Face แล้วเก็บลง cache คืน URL ของภาพและ variant
+    """
+    prompt_en = normalize_prompt(await translate_to_english(user_prompt))
+    key = image_key(prompt_en, MODEL_NAME)
+    cached = await asyncio.to_thread(generated_image_cache.lookup, key)
+    if not cached:
+        await _generate_flight.do(key, _generate_and_store, key, prompt_en)
+    return {**generated_image_cache.urls(key), "prompt_en": prompt_en, "cached": bool(cached)}
+
+
+async def generate_image_from_text(user_prompt: str) -> str:
+    try:
+        assets = await generate_image_assets(user_prompt)
+        return assets["image_url"]
     except Exception as e:
         print("Error in generate_image_from_text:", e)
         raise e
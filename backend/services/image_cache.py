@@ -0,0 +1,199 @@
+# backend/services/image_cache.py
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from backend.services.blob_storage import NAMESPACE_DIRS, blob_storage
+from backend.services.metrics import Counters
+
+logger = logging.getLogger("image_cache")
+
+# งบพื้นที่ดิสก์ของภาพที่สร้างแล้ว (ไบต์) ลบภาพที่ถูกใช้ล่าสุดนานที่สุดก่อน
+GENERATED_IMAGES_MAX_BYTES = int(os.getenv("GENERATED_IMAGES_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# ไฟล์เพิ่มเติมที่สร้างครั้งเดียวตอน generate: webp = ภาพเดิมแบบ WebP, thumb = ภาพย่อ WebP
+GENERATED_IMAGE_VARIANTS = [v.strip() for v in os.getenv("GENERATED_IMAGE_VARIANTS", "").split(",") if v.strip()]
+THUMBNAIL_SIZE = int(os.getenv("GENERATED_IMAGE_THUMB_SIZE", "256"))
+WEBP_QUALITY = 85
+IMAGES_URL_PREFIX = "/images"
+
+_FILENAME_RE = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})(\.png|\.webp|_thumb\.webp)$")
+VARIANT_SUFFIXES = {"png": ".png", "webp": ".webp", "thumb": "_thumb.webp"}
+
+
+def normalize_prompt(prompt: str) -> str:
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+
+def image_key(prompt_en: str, model_name: str) -> str:
+    """
+    sha256 ของ prompt ภาษาอังกฤษ (normalize แล้ว) + ชื่อโมเดล: prompt เดียวกันได้ภาพเดิมเสมอ
+    """
+    payload = json.dumps([normalize_prompt(prompt_en), model_name], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GeneratedImageCache:
+    """
+    เก็บภาพที่สร้างจาก prompt แบบ content-addressed (output/ab/cd/<key>.png) เขียนแบบ atomic
+    ใช้ mtime เป็นเวลาใช้งานล่าสุด (แตะทุกครั้งที่ hit) และลบแบบ LRU เมื่อเกินงบ
+    """
+
+    def __init__(self, root: str = NAMESPACE_DIRS["images"], max_bytes: int = GENERATED_IMAGES_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._used_bytes: Optional[int] = None
+        self._entries: Optional[int] = None
+        self.counters = Counters("hits", "misses", "writes", "variants", "evictions", "evicted_bytes")
+
+    def relative_path(self, key: str, variant: str = "png") -> str:
+        return f"{key[:2]}/{key[2:4]}/{key}{VARIANT_SUFFIXES[variant]}"
+
+    def url_for(self, key: str, variant: str = "png") -> str:
+        return f"{IMAGES_URL_PREFIX}/{self.relative_path(key, variant)}"
+
+    @staticmethod
+    def parse_filename(filename: str) -> Optional[str]:
+        # คืน key ถ้า path อยู่ในรูปแบบที่ cache สร้างเท่านั้น (กัน path traversal)
+        match = _FILENAME_RE.match(filename)
+        if not match or not match.group(3).startswith(match.group(1) + match.group(2)):
+            return None
+        return match.group(3)
+
+    def urls(self, key: str) -> Dict[str, Any]:
+        variants = {
+            variant: self.url_for(key, variant)
+            for variant in GENERATED_IMAGE_VARIANTS
+            if variant in VARIANT_SUFFIXES and os.path.exists(os.path.join(self.root, self.relative_path(key, variant)))
+        }
+        return {"image_url": self.url_for(key), "variants": variants}
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        คืน path ของภาพ (ดึงจาก blob storage ถ้าเครื่องนี้ยังไม่มี) หรือ None
+        """
+        relative = self.relative_path(key)
+        path = blob_storage.fetch("images", relative)
+        if path is None:
+            self.counters.inc("misses")
+            return None
+        self.counters.inc("hits")
+        self.touch(path)
+        for variant in GENERATED_IMAGE_VARIANTS:
+            if variant in VARIANT_SUFFIXES and variant != "png":
+                variant_path = blob_storage.fetch("images", self.relative_path(key, variant))
+                if variant_path:
+                    self.touch(variant_path)
+        return path
+
+    def fetch(self, relative: str) -> Optional[str]:
+        # ไฟล์เดียว (ภาพหลักหรือ variant) สำหรับเสิร์ฟ: ถือเป็นการใช้งานด้วย
+        path = blob_storage.fetch("images", relative)
+        if path is not None:
+            self.touch(path)
+        return path
+
+    def touch(self, path: str) -> None:
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _write(self, relative: str, data: bytes, content_type: str) -> str:
+        path = os.path.join(self.root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        blob_storage.publish("images", relative, content_type)
+        return path
+
+    def _variant_bytes(self, image: Image.Image, variant: str) -> bytes:
+        if variant == "thumb":
+            image = image.copy()
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY)
+        return buffer.getvalue()
+
+    def store(self, key: str, data: bytes) -> str:
+        """
+        บันทึกภาพต้นฉบับ (PNG) และ variant ที่ตั้งค่าไว้ แล้วคุมขนาดรวมของ cache
+        """
+        path = self._write(self.relative_path(key), data, "image/png")
+        self.counters.inc("writes")
+        wanted = [v for v in GENERATED_IMAGE_VARIANTS if v in VARIANT_SUFFIXES and v != "png"]
+        if wanted:
+            try:
+                with Image.open(io.BytesIO(data)) as image:
+                    image.load()
+                    for variant in wanted:
+                        self._write(self.relative_path(key, variant), self._variant_bytes(image, variant), "image/webp")
+                        self.counters.inc("variants")
+            except OSError as e:
+                logger.error(f"สร้าง variant ของภาพ {key} ไม่สำเร็จ: {e}")
+        self.enforce_budget()
+        return path
+
+    def _scan(self) -> List[os.DirEntry]:
+        entries = []
+        for first in os.scandir(self.root):
+            if not first.is_dir():
+                continue
+            for second in os.scandir(first.path):
+                if second.is_dir():
+                    entries.extend(e for e in os.scandir(second.path) if e.is_file() and not e.name.endswith(".tmp"))
+        return entries
+
+    def enforce_budget(self) -> int:
+        """
+        ลบภาพ (พร้อม variant) ที่ใช้งานล่าสุดนานที่สุดจนขนาดรวมไม่เกินงบ คืนจำนวนภาพที่ลบ
+        """
+        with self._lock:
+            if not os.path.isdir(self.root):
+                return 0
+            groups: Dict[str, Dict[str, Any]] = {}
+            for entry in self._scan():
+                stat = entry.stat()
+                key = entry.name[:64]
+                group = groups.setdefault(key, {"size": 0, "mtime": 0.0, "paths": []})
+                group["size"] += stat.st_size
+                group["mtime"] = max(group["mtime"], stat.st_mtime)
+                group["paths"].append(entry.path)
+            used = sum(group["size"] for group in groups.values())
+            evicted = 0
+            for key, group in sorted(groups.items(), key=lambda item: item[1]["mtime"]):
+                if used <= self.max_bytes:
+                    break
+                for path in group["paths"]:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                used -= group["size"]
+                evicted += 1
+                self.counters.inc("evicted_bytes", group["size"])
+            self.counters.inc("evictions", evicted)
+            self._used_bytes = used
+            self._entries = len(groups) - evicted
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        return self.counters.snapshot({
+            # ค่าจากการตรวจงบครั้งล่าสุด
+            "bytes": self._used_bytes,
+            "entries": self._entries,
+            "max_bytes": self.max_bytes,
+            "variants_enabled": GENERATED_IMAGE_VARIANTS,
+        })
+
+
+generated_image_cache = GeneratedImageCache()
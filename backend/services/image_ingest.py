@@ -0,0 +1,163 @@
+# backend/services/image_ingest.py
+import asyncio
+import io
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("image_ingest")
+
+# ขนาดไฟล์สูงสุดที่รับได้ (ไบต์) และขนาดที่อ่านจาก stream ต่อครั้ง
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# เผื่อขนาดของ multipart header และ field อื่น (mode, langs) ในแต่ละ request
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+# ขนาด input ของแต่ละโมเดล: YOLO ย่อด้านยาวเป็น 640, BLIP ย่อภาพเป็น 384x384 (ใช้ด้านสั้น)
+YOLO_INPUT_SIZE = int(os.getenv("YOLO_INPUT_SIZE", "640"))
+BLIP_INPUT_SIZE = int(os.getenv("BLIP_INPUT_SIZE", "384"))
+
+
+def models_for_mode(mode: str) -> List[str]:
+    mode = mode.lower()
+    if "object" in mode:
+        return ["yolo"]
+    if mode == "auto":
+        return ["yolo", "blip"]
+    return ["blip"]
+
+
+def target_scale(size: Tuple[int, int], models: List[str]) -> float:
+    """
+    สัดส่วนการย่อที่เล็กที่สุดที่ยังให้ทุกโมเดลได้ความละเอียดครบ (ไม่ขยายภาพ)
+    """
+    width, height = size
+    scales = []
+    if "yolo" in models:
+        scales.append(YOLO_INPUT_SIZE / max(width, height))
+    if "blip" in models:
+        scales.append(BLIP_INPUT_SIZE / min(width, height))
+    return min(1.0, max(scales)) if scales else 1.0
+
+
+def decode_image(data: bytes, models: List[str]) -> Image.Image:
+    """
+    decode ภาพแบบลดขนาดตั้งแต่ตอน decode (JPEG draft mode) หมุนตาม EXIF แล้วย่อครั้งเดียว
+    """
+    image = Image.open(io.BytesIO(data))
+    oriented_size = image.size
+    orientation = image.getexif().get(0x0112, 1)
+    if orientation in (5, 6, 7, 8):
+        oriented_size = (image.size[1], image.size[0])
+    scale = target_scale(oriented_size, models)
+
+    if image.format == "JPEG" and scale < 1.0:
+        # draft เลือก scale 1/2, 1/4, 1/8 ที่ยังใหญ่กว่าหรือเท่ากับขนาดที่ขอ
+        image.draft("RGB", (math.ceil(image.size[0] * scale), math.ceil(image.size[1] * scale)))
+
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGB")
+
+    final_size = (
+        max(1, round(oriented_size[0] * scale)),
+        max(1, round(oriented_size[1] * scale)),
+    )
+    if image.size[0] > final_size[0] or image.size[1] > final_size[1]:
+        image = image.resize(final_size, Image.BICUBIC, reducing_gap=2.0)
+    return image
+
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"ไฟล์ภาพใหญ่เกิน {max_bytes // (1024 * 1024)} MB"
+
+
+class UploadLimitMiddleware:
+    """
+    จำกัดขนาด body ของ request ที่ path ขึ้นต้นด้วย prefix ที่กำหนด ก่อนที่ Starlette จะเก็บ multipart ลงดิสก์:
+    ปฏิเสธทันทีจาก Content-Length และนับไบต์ระหว่างรับ stream (กรณี chunked หรือ header ไม่ตรง)
+    read_upload_bytes ยังตรวจขนาดต่อไฟล์อีกชั้นหนึ่ง
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        # prefix ที่ยาวกว่าต้องถูกเทียบก่อน (เช่น /analyze/batch ก่อน /analyze)
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limit_for(self, path: str) -> Optional[int]:
+        for prefix, limit in self.limits:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return limit
+        return None
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, limit: int) -> None:
+        response = JSONResponse(status_code=413, content={"detail": _too_large_detail(limit)})
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self._limit_for(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            logger.warning(f"Rejected {scope['path']}: Content-Length {int(content_length)} > {limit}")
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI ส่ง HTTPException ที่เกิดระหว่างอ่าน body ต่อให้ exception handler (ได้ 413)
+                    raise HTTPException(status_code=413, detail=_too_large_detail(limit))
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(scope, receive, send, limit)
+
+
+async def read_upload_bytes(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    อ่านไฟล์จาก stream ทีละ chunk และหยุดทันทีเมื่อเกินขนาดที่กำหนด
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
+    return bytes(buffer)
+
+
+async def ingest_upload(upload: UploadFile, mode: str) -> Image.Image:
+    data = await read_upload_bytes(upload)
+    if not data:
+        raise HTTPException(status_code=400, detail="ไม่ได้รับไฟล์ภาพ")
+    try:
+        return await asyncio.to_thread(decode_image, data, models_for_mode(mode))
+    except (OSError, Image.DecompressionBombError) as e:
+        raise HTTPException(status_code=400, detail=f"ไฟล์ภาพไม่ถูกต้อง: {str(e)}")
@@ -0,0 +1,252 @@
+# backend/services/inference_executor.py
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from backend.services.metrics import Counters, Histogram
+from backend.services.model_registry import ML_ENABLED, model_registry
+
+logger = logging.getLogger("inference_executor")
+
+# thread = ThreadPoolExecutor (โมเดลโหลดครั้งเดียวใน process หลัก)
+# process = ProcessPoolExecutor (แต่ละ worker โหลดโมเดลของตัวเอง ส่งภาพผ่าน shared memory)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+# จำนวนงานสูงสุดที่รอคิว + กำลังรัน ก่อนที่ผู้เรียนรายใหม่จะต้องรอ
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "32"))
+
+
+class SharedImage:
+    """
+    handle ขนาดเล็กที่ส่งข้าม process แทนตัว pixel ของภาพ
+    """
+
+    def __init__(self, name: str, mode: str, size: Tuple[int, int], nbytes: int):
+        self.name = name
+        self.mode = mode
+        self.size = size
+        self.nbytes = nbytes
+
+
+def _share_image(image: Image.Image) -> Tuple[SharedImage, shared_memory.SharedMemory]:
+    data = image.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    shm.buf[:len(data)] = data
+    return SharedImage(shm.name, image.mode, image.size, len(data)), shm
+
+
+def _open_shared(handle: SharedImage) -> Image.Image:
+    shm = shared_memory.SharedMemory(name=handle.name)
+    try:
+        return Image.frombytes(handle.mode, handle.size, shm.buf[:handle.nbytes])
+    finally:
+        shm.close()
+
+
+def _pack(arg: Any, segments: List[shared_memory.SharedMemory]) -> Any:
+    if isinstance(arg, Image.Image):
+        handle, shm = _share_image(arg)
+        segments.append(shm)
+        return handle
+    if isinstance(arg, list):
+        return [_pack(item, segments) for item in arg]
+    return arg
+
+
+def _unpack(arg: Any) -> Any:
+    if isinstance(arg, SharedImage):
+        return _open_shared(arg)
+    if isinstance(arg, list):
+        return [_unpack(item) for item in arg]
+    return arg
+
+
+def _init_worker(modules: List[str], names: List[str], ready_queue: Any) -> None:
+    """
+    initializer ของ worker process: import module ที่ลงทะเบียนโมเดล แล้วโหลด + warmup ก่อนรับงานแรก
+    จากนั้นรายงานสถานะโมเดลของ worker นี้กลับไปยัง process หลัก
+    """
+    error = None
+    try:
+        for module in modules:
+            importlib.import_module(module)
+        for name in names:
+            try:
+                model_registry.get(name)
+            except Exception:
+                continue
+    except Exception as e:
+        error = str(e)
+    status = model_registry.status()
+    for name in names:
+        status.setdefault(name, {"state": "failed", "error": error})
+    ready_queue.put((os.getpid(), status))
+
+
+def _run_in_worker(fn: Callable, args: Tuple) -> Any:
+    # ทำงานใน worker process: ประกอบภาพกลับจาก shared memory แล้วเรียกฟังก์ชันจริง
+    return fn(*[_unpack(arg) for arg in args])
+
+
+class InferenceExecutor:
+    """
+    executor กลางสำหรับงาน inference (YOLO / BLIP) เพื่อไม่ให้บล็อก event loop
+    """
+
+    def __init__(self, kind: str = INFERENCE_EXECUTOR, workers: int = INFERENCE_WORKERS,
+                 max_pending: int = INFERENCE_MAX_PENDING):
+        self.kind = kind if kind in ("thread", "process") else "thread"
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        # process pool: โมเดลที่ worker ต้องโหลดตอนเริ่ม และสถานะโมเดลที่แต่ละ worker รายงาน (pid -> status)
+        self._preload: Optional[Tuple[List[str], List[str]]] = None
+        self._ready_queue: Any = None
+        self.worker_models: Dict[int, Dict[str, Any]] = {}
+        self._inflight = 0
+        self._waiting = 0
+        self._inflight_lock = threading.Lock()
+        self.job_latency_ms = Histogram()
+        self.queue_wait_ms = Histogram()
+        self.counters = Counters("submitted", "completed", "failed")
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    context = multiprocessing.get_context("spawn")
+                    kwargs: Dict[str, Any] = {}
+                    if self._preload is not None:
+                        self._ready_queue = context.Queue()
+                        kwargs = {"initializer": _init_worker, "initargs": (*self._preload, self._ready_queue)}
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, **kwargs)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="inference"
+                    )
+                logger.info(f"Inference executor started: kind={self.kind}, workers={self.workers}")
+            return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    def _track(self, inflight: int = 0, waiting: int = 0) -> None:
+        with self._inflight_lock:
+            self._inflight += inflight
+            self._waiting += waiting
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        ส่งงาน fn(*args) ไปรันใน pool และรอผลแบบ async
+        ภาพ PIL (หรือ list ของภาพ) ใน args จะถูกส่งผ่าน shared memory เมื่อใช้ process pool
+        """
+        submitted_at = time.perf_counter()
+        self._track(waiting=1)
+        try:
+            await self._get_slots().acquire()
+        finally:
+            self._track(waiting=-1)
+        try:
+            self.queue_wait_ms.observe((time.perf_counter() - submitted_at) * 1000)
+            self._track(inflight=1)
+            self.counters.inc("submitted")
+            segments: List[shared_memory.SharedMemory] = []
+            started = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                if self.kind == "process":
+                    packed = tuple(_pack(arg, segments) for arg in args)
+                    result = await loop.run_in_executor(self._get_executor(), _run_in_worker, fn, packed)
+                else:
+                    result = await loop.run_in_executor(self._get_executor(), lambda: fn(*args))
+                self.counters.inc("completed")
+                return result
+            except Exception:
+                self.counters.inc("failed")
+                raise
+            finally:
+                self.job_latency_ms.observe((time.perf_counter() - started) * 1000)
+                self._track(inflight=-1)
+                for shm in segments:
+                    shm.close()
+                    shm.unlink()
+        finally:
+            self._get_slots().release()
+
+    async def preload_workers(self, names: List[str]) -> None:
+        """
+        โหมด process: โหลด + warmup โมเดลใน worker ทุกตัวตอน startup (process หลักไม่โหลดโมเดล)
+        แล้วเก็บสถานะที่แต่ละ worker รายงานไว้ให้ /health/ready
+        """
+        if self.kind != "process" or not ML_ENABLED:
+            return
+        names = model_registry.resolve(names)
+        with self._executor_lock:
+            if self._executor is not None:
+                logger.warning("Inference pool started before preload; workers will load models lazily")
+                return
+            self._preload = (model_registry.modules_for(names), names)
+        executor = self._get_executor()
+        # งานว่างเท่าจำนวน worker ทำให้ pool สร้าง worker ครบทุกตัวทันที (แต่ละตัวรัน initializer)
+        for _ in range(self.workers):
+            executor.submit(os.getpid)
+        while len(self.worker_models) < self.workers:
+            try:
+                pid, status = await asyncio.to_thread(self._ready_queue.get, True, 1.0)
+            except queue.Empty:
+                continue
+            self.worker_models[pid] = status
+            states = {name: entry["state"] for name, entry in status.items()}
+            logger.info(f"Inference worker {pid} models: {states}")
+
+    def workers_ready(self, names: List[str]) -> bool:
+        if not ML_ENABLED:
+            return True
+        names = model_registry.resolve(names)
+        if len(self.worker_models) < self.workers:
+            return False
+        return all(
+            status.get(name, {}).get("state") == "ready"
+            for status in self.worker_models.values()
+            for name in names
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._inflight_lock:
+            inflight, waiting = self._inflight, self._waiting
+        return self.counters.snapshot({
+            "kind": self.kind,
+            "workers": self.workers,
+            "inflight": inflight,
+            "queue_depth": waiting + max(0, inflight - self.workers),
+            "job_latency_ms": self.job_latency_ms.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        })
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.worker_models = {}
+
+
+inference_executor = InferenceExecutor()
+
+
+async def run_inference(fn: Callable, *args: Any) -> Any:
+    return await inference_executor.run(fn, *args)
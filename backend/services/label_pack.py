@@ -0,0 +1,141 @@
+# backend/services/label_pack.py
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services.metrics import Counters
+
+logger = logging.getLogger("label_pack")
+
+# label pack = คำแปล + ไฟล์เสียงของทุก class ของ YOLO x ทุกภาษา ที่สร้างไว้ล่วงหน้าด้วย
+#   python -m backend.scripts.build_label_pack
+# โครงสร้าง: LABEL_PACK_DIR/<version>/manifest.json, LABEL_PACK_DIR/<version>/audio/<lang>/<file>.mp3
+# และ LABEL_PACK_DIR/current.json ชี้ไปยัง version ที่ใช้งาน (override ได้ด้วย LABEL_PACK_VERSION)
+LABEL_PACK_ENABLED = os.getenv("LABEL_PACK_ENABLED", "true").lower() == "true"
+LABEL_PACK_DIR = os.getenv("LABEL_PACK_DIR", "label_pack")
+LABEL_PACK_VERSION = os.getenv("LABEL_PACK_VERSION", "")
+LABEL_PACK_URL_PREFIX = "/label-pack"
+MANIFEST_NAME = "manifest.json"
+CURRENT_NAME = "current.json"
+MISSES_NAME = "misses.jsonl"
+
+
+def version_dir(version: str, base_dir: str = LABEL_PACK_DIR) -> str:
+    return os.path.join(base_dir, version)
+
+
+def read_current_version(base_dir: str = LABEL_PACK_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(base_dir, CURRENT_NAME), encoding="utf-8") as f:
+            return json.load(f).get("version")
+    except FileNotFoundError:
+        return None
+
+
+def write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+class LabelPack:
+    """
+    lookup คำแปล + audio ของ label จาก pack ที่โหลดไว้ในหน่วยความจำ (ไม่มี network call)
+    entry ที่ไม่มีใน pack (class ที่รู้จักแต่ขาดบางภาษา) จะถูกนับและบันทึกลง misses.jsonl
+    เพื่อให้การ build ครั้งถัดไปเติมได้
+    """
+
+    def __init__(self, base_dir: str = LABEL_PACK_DIR):
+        self.base_dir = base_dir
+        self.version: Optional[str] = None
+        self.manifest: Dict[str, Any] = {}
+        self._entries: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self._misses: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.counters = Counters("hits", "misses")
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def load(self, version: Optional[str] = None) -> bool:
+        version = version or LABEL_PACK_VERSION or read_current_version(self.base_dir)
+        if not version:
+            logger.info("ไม่พบ label pack (ยังไม่ได้ build) ใช้การแปลแบบ live")
+            return False
+        path = os.path.join(version_dir(version, self.base_dir), MANIFEST_NAME)
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"โหลด label pack {version} ไม่สำเร็จ: {e}")
+            return False
+        entries = manifest.get("entries", {})
+        with self._lock:
+            self.version = version
+            self.manifest = manifest
+            self._entries = entries
+        logger.info(f"โหลด label pack {version}: {len(entries)} labels x {len(manifest.get('languages', []))} ภาษา")
+        return True
+
+    def lookup(self, text: str, lang_code: str) -> Optional[Dict[str, str]]:
+        if not self.loaded:
+            return None
+        per_lang = self._entries.get(text)
+        if per_lang is None:
+            # ไม่ใช่ label ของโมเดล (เช่นคำบรรยายจาก BLIP) ไม่นับเป็น miss
+            return None
+        item = per_lang.get(lang_code)
+        if item is None:
+            self.record_miss(text, lang_code)
+            return None
+        self.counters.inc("hits")
+        return {
+            "translated": item["translated"],
+            "audio_url": f"{LABEL_PACK_URL_PREFIX}/{self.version}/{item['audio']}",
+        }
+
+    def record_miss(self, text: str, lang_code: str) -> None:
+        self.counters.inc("misses")
+        key = (text, lang_code)
+        with self._lock:
+            first_time = key not in self._misses
+            self._misses[key] = self._misses.get(key, 0) + 1
+        if not first_time:
+            return
+        logger.info(f"label pack ไม่มี {text!r} ภาษา {lang_code} ใช้การแปลแบบ live")
+        try:
+            with open(os.path.join(self.base_dir, MISSES_NAME), "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "label": text,
+                    "lang_code": lang_code,
+                    "version": self.version,
+                    "at": datetime.utcnow().isoformat(),
+                }, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"บันทึก label pack miss ไม่สำเร็จ: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            misses = sorted(self._misses.items(), key=lambda kv: -kv[1])[:20]
+        return self.counters.snapshot({
+            "enabled": LABEL_PACK_ENABLED,
+            "version": self.version,
+            "labels": len(self._entries),
+            "languages": len(self.manifest.get("languages", [])),
+            "built_at": self.manifest.get("built_at"),
+            "top_misses": [{"label": label, "lang_code": lang, "count": n} for (label, lang), n in misses],
+        })
+
+
+label_pack = LabelPack()
+
+
+def load_label_pack() -> bool:
+    if not LABEL_PACK_ENABLED:
+        return False
+    return label_pack.load()
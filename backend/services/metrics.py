@@ -0,0 +1,68 @@
+# backend/services/metrics.py
+import threading
+from typing import Dict, Iterable, Optional
+
+# bucket ของเวลา (มิลลิวินาที) ที่ใช้เป็นค่าเริ่มต้น
+DEFAULT_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """
+    histogram แบบง่าย (thread-safe) สำหรับรายงานผ่าน /stats/runtime
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            buckets = {f"le_{bound:g}": n for bound, n in zip(self.buckets, self._counts)}
+            buckets["inf"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "avg": round(self._sum / self._count, 3) if self._count else 0.0,
+                "max": round(self._max, 3),
+                "buckets": buckets,
+            }
+
+
+class Counters:
+    """
+    กลุ่ม counter ตามชื่อ (thread-safe)
+    """
+
+    def __init__(self, *names: str):
+        self._values: Dict[str, int] = {name: 0 for name in names}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def snapshot(self, extra: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            data = dict(self._values)
+        if extra:
+            data.update(extra)
+        return data
@@ -0,0 +1,134 @@
+# backend/services/model_registry.py
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("model_registry")
+
+# ML_ENABLED=false สำหรับ worker ที่ให้บริการเฉพาะ auth / stats (ไม่ import torch / ultralytics เลย)
+ML_ENABLED = os.getenv("ML_ENABLED", "true").lower() == "true"
+# lazy = โหลดเมื่อถูกเรียกใช้ครั้งแรก, startup = โหลดตอน app lifespan เริ่ม
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "lazy").lower()
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+PRELOAD_MODELS = [name.strip() for name in os.getenv("PRELOAD_MODELS", "yolo,blip").split(",") if name.strip()]
+
+
+class ModelsDisabledError(RuntimeError):
+    pass
+
+
+class ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        # module ที่ลงทะเบียนโมเดลนี้ (worker process ต้อง import ก่อนจึงจะรู้จักโมเดล)
+        self.module = loader.__module__
+        self.model: Any = None
+        self.state = "not_loaded" if ML_ENABLED else "disabled"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    ที่เก็บโมเดลกลาง: โหลดแต่ละโมเดลครั้งเดียว (thread-safe) พร้อม warmup และสถานะสำหรับ /health/ready
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, ModelEntry] = {}
+        # ชื่อเดิม -> ชื่อโมเดลที่ใช้แทน (เช่น yolo -> yolo_cascade) สำหรับ PRELOAD_MODELS และ readiness
+        self._replaced: Dict[str, str] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], Any]] = None,
+                 replaces: Optional[str] = None) -> None:
+        self._entries[name] = ModelEntry(name, loader, warmup)
+        if replaces:
+            self._replaced[replaces] = name
+
+    def resolve(self, names: List[str]) -> List[str]:
+        resolved: List[str] = []
+        for name in names:
+            name = self._replaced.get(name, name)
+            if name not in resolved:
+                resolved.append(name)
+        return resolved
+
+    def get(self, name: str) -> Any:
+        entry = self._entries[name]
+        if entry.state == "ready":
+            return entry.model
+        if not ML_ENABLED:
+            raise ModelsDisabledError(f"Model '{name}' is disabled on this worker (ML_ENABLED=false)")
+        with entry.lock:
+            if entry.state != "ready":
+                self._load(entry)
+        return entry.model
+
+    def _load(self, entry: ModelEntry) -> None:
+        entry.state = "loading"
+        entry.error = None
+        started = time.perf_counter()
+        try:
+            model = entry.loader()
+            entry.load_seconds = round(time.perf_counter() - started, 3)
+            if MODEL_WARMUP and entry.warmup:
+                warmup_started = time.perf_counter()
+                entry.warmup(model)
+                entry.warmup_seconds = round(time.perf_counter() - warmup_started, 3)
+            entry.model = model
+            entry.state = "ready"
+            logger.info(f"Model '{entry.name}' ready: load={entry.load_seconds}s, warmup={entry.warmup_seconds}s")
+        except Exception as e:
+            entry.state = "failed"
+            entry.error = str(e)
+            logger.error(f"Model '{entry.name}' failed to load: {e}", exc_info=True)
+            raise
+
+    def modules_for(self, names: List[str]) -> List[str]:
+        modules: List[str] = []
+        for name in self.resolve(names):
+            entry = self._entries.get(name)
+            if entry and entry.module not in modules:
+                modules.append(entry.module)
+        return modules
+
+    async def preload(self, names: Optional[List[str]] = None) -> None:
+        """
+        โหลดโมเดลตอน startup (ทีละตัวใน thread เพื่อไม่บล็อก event loop)
+        """
+        if not ML_ENABLED:
+            return
+        for name in self.resolve(names or list(self._entries)):
+            if name not in self._entries:
+                logger.warning(f"Unknown model in PRELOAD_MODELS: {name}")
+                continue
+            try:
+                await asyncio.to_thread(self.get, name)
+            except Exception:
+                continue
+
+    def is_ready(self, names: Optional[List[str]] = None) -> bool:
+        if not ML_ENABLED:
+            return True
+        entries = [self._entries[name] for name in self.resolve(names or list(self._entries)) if name in self._entries]
+        return all(entry.state == "ready" for entry in entries)
+
+    def status(self) -> Dict[str, Any]:
+        return {name: entry.status() for name, entry in self._entries.items()}
+
+
+model_registry = ModelRegistry()
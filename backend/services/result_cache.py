@@ -0,0 +1,213 @@
+# backend/services/result_cache.py
+import asyncio
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from PIL import Image
+
+from backend.services.metrics import Counters
+
+logger = logging.getLogger("result_cache")
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+# งบหน่วยความจำของ cache ใน process (ไบต์) และระยะ Hamming สูงสุดที่ถือว่าเป็นภาพซ้ำ
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+RESULT_CACHE_MAX_DISTANCE = int(os.getenv("RESULT_CACHE_MAX_DISTANCE", "4"))
+# เก็บผลลง Mongo (collection analysis_cache) ด้วยเพื่อแชร์ข้าม worker / restart
+RESULT_CACHE_MONGO = os.getenv("RESULT_CACHE_MONGO", "false").lower() == "true"
+
+# ค่าประมาณ overhead ต่อรายการ (key tuple, dict, OrderedDict node) และต่อวัตถุใน objects
+_ENTRY_OVERHEAD = 400
+_OBJECT_OVERHEAD = 600
+
+
+def image_hash(image: Image.Image) -> int:
+    """
+    difference hash (dHash) 64 บิต: ย่อเป็น 9x8 ระดับเทา แล้วเทียบ pixel ที่อยู่ติดกัน
+    """
+    small = image.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def hash_bands(max_distance: int, bits: int = 64) -> List[Tuple[int, int]]:
+    """
+    แบ่ง hash เป็น max_distance + 1 ช่วง (shift, mask): hash สองค่าที่ห่างกันไม่เกิน max_distance บิต
+    ต้องมีอย่างน้อยหนึ่งช่วงที่เหมือนกันทุกบิต (pigeonhole) จึงค้นเฉพาะ hash ที่ช่วงตรงกันก็พอ
+    """
+    count = min(max(max_distance, 0) + 1, bits)
+    bands = []
+    start = 0
+    for i in range(count):
+        width = bits // count + (1 if i < bits % count else 0)
+        bands.append((start, (1 << width) - 1))
+        start += width
+    return bands
+
+
+def normalize_mode(mode: str) -> str:
+    mode = mode.lower()
+    if "object" in mode:
+        return "object"
+    if mode == "auto":
+        return "auto"
+    return "caption"
+
+
+class ResultCache:
+    """
+    cache ผลการวิเคราะห์ภาพ (label + image_class + objects) โดยใช้ perceptual hash ของภาพ + mode เป็น key
+    ชั้นแรกเป็น LRU ในหน่วยความจำ ชั้นที่สอง (optional) เป็น Mongo
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 max_distance: int = RESULT_CACHE_MAX_DISTANCE,
+                 use_mongo: bool = RESULT_CACHE_MONGO):
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.use_mongo = use_mongo
+        self._entries: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[Tuple[str, int], int] = {}
+        self._bytes = 0
+        # (mode, ลำดับช่วง, ค่าของช่วง) -> hash ที่มีช่วงนั้นตรงกัน ใช้หาภาพใกล้เคียงโดยไม่ต้องไล่ทุกรายการ
+        self._bands = hash_bands(max_distance)
+        self._band_index: Dict[Tuple[str, int, int], Set[int]] = {}
+        self._lock = threading.Lock()
+        self.counters = Counters("hits", "near_hits", "mongo_hits", "misses", "evictions")
+
+    def _find(self, mode: str, phash: int) -> Optional[Tuple[Tuple[str, int], Dict[str, Any]]]:
+        key = (mode, phash)
+        if key in self._entries:
+            return key, self._entries[key]
+        if self.max_distance <= 0:
+            return None
+        candidates: Set[int] = set()
+        for band, (shift, mask) in enumerate(self._bands):
+            candidates.update(self._band_index.get((mode, band, (phash >> shift) & mask), ()))
+        best = None
+        for other in candidates:
+            distance = hamming_distance(other, phash)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, other)
+        if best is None:
+            return None
+        other_key = (mode, best[1])
+        return other_key, self._entries[other_key]
+
+    def _index_add(self, key: Tuple[str, int]) -> None:
+        mode, phash = key
+        for band, (shift, mask) in enumerate(self._bands):
+            self._band_index.setdefault((mode, band, (phash >> shift) & mask), set()).add(phash)
+
+    def _index_remove(self, key: Tuple[str, int]) -> None:
+        mode, phash = key
+        for band, (shift, mask) in enumerate(self._bands):
+            band_key = (mode, band, (phash >> shift) & mask)
+            bucket = self._band_index.get(band_key)
+            if bucket is not None:
+                bucket.discard(phash)
+                if not bucket:
+                    del self._band_index[band_key]
+
+    def get_local(self, mode: str, phash: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            found = self._find(mode, phash)
+            if not found:
+                return None
+            key, entry = found
+            self._entries.move_to_end(key)
+        self.counters.inc("hits" if key[1] == phash else "near_hits")
+        return entry
+
+    def put_local(self, mode: str, phash: int, label: str, image_class: str,
+                  objects: Optional[List[Dict[str, Any]]] = None) -> None:
+        key = (mode, phash)
+        entry = {"label": label, "image_class": image_class, "objects": objects or []}
+        size = (_ENTRY_OVERHEAD + sys.getsizeof(label) + sys.getsizeof(image_class)
+                + _OBJECT_OVERHEAD * len(entry["objects"]))
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            else:
+                self._index_add(key)
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self._index_remove(old_key)
+                self.counters.inc("evictions")
+
+    async def get(self, db: AsyncIOMotorDatabase, mode: str, phash: int) -> Optional[Dict[str, Any]]:
+        entry = self.get_local(mode, phash)
+        if entry:
+            return entry
+        if self.use_mongo:
+            try:
+                doc = await db.analysis_cache.find_one({"mode": mode, "phash": format(phash, "016x")})
+                if doc:
+                    self.counters.inc("mongo_hits")
+                    entry = {
+                        "label": doc["label"],
+                        "image_class": doc["image_class"],
+                        "objects": doc.get("objects") or [],
+                    }
+                    self.put_local(mode, phash, entry["label"], entry["image_class"], entry["objects"])
+                    return entry
+            except Exception as e:
+                logger.error(f"Mongo result cache lookup failed: {e}")
+        self.counters.inc("misses")
+        return None
+
+    async def put(self, db: AsyncIOMotorDatabase, mode: str, phash: int, label: str, image_class: str,
+                  objects: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.put_local(mode, phash, label, image_class, objects)
+        if self.use_mongo:
+            try:
+                await db.analysis_cache.update_one(
+                    {"mode": mode, "phash": format(phash, "016x")},
+                    {"$set": {
+                        "label": label,
+                        "image_class": image_class,
+                        "objects": objects or [],
+                        "updated_at": datetime.utcnow(),
+                    }},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.error(f"Mongo result cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, used = len(self._entries), self._bytes
+        return self.counters.snapshot({
+            "entries": entries,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "max_distance": self.max_distance,
+        })
+
+
+result_cache = ResultCache()
+
+
+async def compute_image_hash(image: Image.Image) -> int:
+    return await asyncio.to_thread(image_hash, image)
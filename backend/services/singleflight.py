@@ -0,0 +1,103 @@
+# backend/services/singleflight.py
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from backend.services.metrics import Counters
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    รวมงานที่ key เดียวกันซึ่งกำลังรันพร้อมกันให้เหลือครั้งเดียว (thread-safe)
+    ผู้เรียกที่มาระหว่างที่งานยังไม่เสร็จจะรอและได้ผลลัพธ์เดียวกัน
+    ถ้างานล้มเหลว ทุกคนที่รออยู่จะได้ exception เดียวกัน และครั้งถัดไปจะรันใหม่ (ไม่ cache ความล้มเหลว)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.counters = Counters("calls", "executions", "coalesced", "failures")
+        _groups.append(self)
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        self.counters.inc("calls")
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        if not leader:
+            self.counters.inc("coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self.counters.inc("executions")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            self.counters.inc("failures")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = len(self._calls)
+        return self.counters.snapshot({"inflight": inflight})
+
+
+class AsyncSingleFlight:
+    """
+    single-flight สำหรับ coroutine บน event loop เดียวกัน: ผู้เรียกที่ key ซ้ำจะรอ future ของงานแรก
+    ผู้รอที่ถูกยกเลิก (เช่นหมด deadline) ไม่ทำให้งานหลักถูกยกเลิกตาม
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, "asyncio.Future"] = {}
+        self.counters = Counters("calls", "executions", "coalesced", "failures")
+        _groups.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        self.counters.inc("calls")
+        future = self._calls.get(key)
+        if future is not None:
+            self.counters.inc("coalesced")
+            return await asyncio.shield(future)
+
+        self.counters.inc("executions")
+        future = asyncio.ensure_future(fn(*args, **kwargs))
+        self._calls[key] = future
+
+        def _finished(done: "asyncio.Future") -> None:
+            self._calls.pop(key, None)
+            if done.cancelled() or done.exception() is not None:
+                self.counters.inc("failures")
+
+        future.add_done_callback(_finished)
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.counters.snapshot({"inflight": len(self._calls)})
+
+
+_groups: List[Any] = []
+
+
+def singleflight_stats() -> Dict[str, Any]:
+    return {group.name: group.stats() for group in _groups}
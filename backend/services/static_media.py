@@ -0,0 +1,205 @@
+# backend/services/static_media.py
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from backend.services.metrics import Counters
+
+logger = logging.getLogger("static_media")
+
+# ขนาด chunk ตอนอ่านไฟล์เองเมื่อ server ไม่รองรับ zero-copy และจำนวน ETag ของไฟล์ทั่วไปที่จำไว้
+MEDIA_CHUNK_SIZE = 256 * 1024
+ETAG_CACHE_ENTRIES = 4096
+# ไฟล์ content-addressed ไม่มีวันเปลี่ยน จึง cache ได้ถาวร; ไฟล์อื่นต้อง revalidate ด้วย ETag ทุกครั้ง
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+media_counters = Counters("requests", "not_modified", "partial", "full", "range_errors", "zero_copy", "bytes_sent")
+
+_etags: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    แปลง Range header แบบช่วงเดียวเป็น (start, end) รวมปลาย คืน None = ส่งทั้งไฟล์
+    (หลายช่วงหรือรูปแบบที่ไม่รู้จักจะส่งทั้งไฟล์ตาม RFC 9110)
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    spec = header[len("bytes="):].strip()
+    first, sep, last = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            # bytes=-N = N ไบต์สุดท้าย
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def content_etag(path: str, stat: os.stat_result) -> str:
+    """
+    strong ETag จาก sha256 ของเนื้อไฟล์ (คำนวณครั้งเดียวต่อ path + ขนาด + mtime)
+    """
+    cache_key = (path, stat.st_size, stat.st_mtime_ns)
+    with _etags_lock:
+        etag = _etags.get(cache_key)
+        if etag is not None:
+            _etags.move_to_end(cache_key)
+            return etag
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(MEDIA_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+    with _etags_lock:
+        _etags[cache_key] = etag
+        while len(_etags) > ETAG_CACHE_ENTRIES:
+            _etags.popitem(last=False)
+    return etag
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [value.strip() for value in header.split(",")]
+    # If-None-Match ใช้การเทียบแบบ weak
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class MediaFileResponse(Response):
+    """
+    ส่งไฟล์ทั้งไฟล์หรือบางช่วง: ใช้ ASGI extension zerocopysend/pathsend ถ้า server รองรับ
+    ไม่เช่นนั้นอ่านเป็น chunk ใน thread
+    """
+
+    def __init__(self, path: str, status_code: int, headers: Dict[str, str], media_type: Optional[str],
+                 start: int = 0, length: int = 0, send_body: bool = True, whole_file: bool = True):
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+        self.whole_file = whole_file
+
+    def init_headers(self, headers=None) -> None:
+        # Content-Length ถูกกำหนดเองใน headers แล้ว
+        self.raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in (headers or {}).items()]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            media_counters.inc("zero_copy")
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+        elif "http.response.pathsend" in extensions and self.whole_file:
+            media_counters.inc("zero_copy")
+            await send({"type": "http.response.pathsend", "path": self.path})
+        else:
+            with open(self.path, "rb") as f:
+                f.seek(self.start)
+                remaining = self.length
+                while remaining > 0:
+                    chunk = await asyncio.to_thread(f.read, min(MEDIA_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining > 0:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        media_counters.inc("bytes_sent", self.length)
+
+
+async def media_response(request: Request, path: str, media_type: Optional[str] = None,
+                         etag: Optional[str] = None, immutable: bool = False) -> Response:
+    """
+    สร้าง response ของไฟล์ media พร้อม ETag, Cache-Control, 304 และ Range/206
+    etag: ระบุเองสำหรับไฟล์ content-addressed (ไม่ต้องอ่านไฟล์) ไม่เช่นนั้นคำนวณจากเนื้อไฟล์
+    """
+    media_counters.inc("requests")
+    try:
+        stat = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if etag is None:
+        etag = await asyncio.to_thread(content_etag, path, stat)
+    size = stat.st_size
+    headers = {
+        "etag": etag,
+        "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+    }
+    media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        media_counters.inc("not_modified")
+        return Response(status_code=304, headers=headers)
+
+    send_body = request.method != "HEAD"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() != etag:
+        # เนื้อไฟล์เปลี่ยนไปจากที่ client มีอยู่ ส่งทั้งไฟล์
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        media_counters.inc("range_errors")
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+    if byte_range is None:
+        media_counters.inc("full")
+        headers["content-length"] = str(size)
+        headers["content-type"] = media_type
+        return MediaFileResponse(path, 200, headers, media_type, 0, size, send_body)
+
+    start, end = byte_range
+    media_counters.inc("partial")
+    headers["content-length"] = str(end - start + 1)
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    headers["content-type"] = media_type
+    return MediaFileResponse(path, 206, headers, media_type, start, end - start + 1, send_body,
+                             whole_file=(start == 0 and end == size - 1))
+
+
+def media_stats() -> Dict[str, Any]:
+    with _etags_lock:
+        etag_entries = len(_etags)
+    return media_counters.snapshot({"etag_cache_entries": etag_entries})
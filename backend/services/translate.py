@@ -1,5 +1,65 @@
+import asyncio
+import time
+
 from deep_translator import GoogleTranslator
 
+from backend.services.singleflight import AsyncSingleFlight, SingleFlight
+from backend.services.translation_cache import TRANSLATION_CACHE_ENABLED, make_key, translation_cache
+from backend.services.translation_providers import get_translator
+
+SOURCE_LANG = "auto"
+
+# คำขอแปลคำเดียวกันที่มาพร้อมกันจะเรียก upstream เพียงครั้งเดียว
+_translate_flight = SingleFlight("translate")
+
+
+def _translate_upstream(text, target_lang):
+    if TRANSLATION_CACHE_ENABLED:
+        # อาจมีอีก flight ที่เพิ่งเขียน cache เสร็จก่อนหน้านี้
+        cached = translation_cache.get_local(make_key(text, SOURCE_LANG, target_lang))
+        if cached is not None:
+            return cached
+    started = time.perf_counter()
+    translated = GoogleTranslator(source=SOURCE_LANG, target=target_lang).translate(text)
+    translation_cache.upstream_latency_ms.observe((time.perf_counter() - started) * 1000)
+    if TRANSLATION_CACHE_ENABLED and translated:
+        translation_cache.put(text, SOURCE_LANG, target_lang, translated)
+    return translated
+
+
 def translate_text(text, target_lang):
-    return GoogleTranslator(source="auto", target=target_lang).translate(text)
-    
\ No newline at end of file
+    if TRANSLATION_CACHE_ENABLED:
+        cached = translation_cache.get(text, SOURCE_LANG, target_lang)
+        if cached is not None:
+            return cached
+    return _translate_flight.do(make_key(text, SOURCE_LANG, target_lang), _translate_upstream, text, target_lang)
+
+
+# คำขอแบบ async ที่ซ้ำกันระหว่างรอ provider จะใช้ผลลัพธ์เดียวกัน
+_translate_async_flight = AsyncSingleFlight("translate_async")
+
+
+async def _translate_provider(text, target_lang):
+    translated = await get_translator().translate(text, target_lang, SOURCE_LANG)
+    if TRANSLATION_CACHE_ENABLED and translated:
+        await asyncio.to_thread(translation_cache.put, text, SOURCE_LANG, target_lang, translated)
+    return translated
+
+
+async def translate_text_async(text, target_lang):
+    """
+    เหมือน translate_text แต่ไม่ใช้ thread: ใช้ async provider (connection pool, deadline, hedged retry)
+    """
+    key = make_key(text, SOURCE_LANG, target_lang)
+    if TRANSLATION_CACHE_ENABLED:
+        cached = translation_cache.get_local(key)
+        if cached is not None:
+            translation_cache.counters.inc("hits")
+            return cached
+        if translation_cache.use_mongo:
+            cached = await asyncio.to_thread(translation_cache.get, text, SOURCE_LANG, target_lang)
+            if cached is not None:
+                return cached
+        else:
+            translation_cache.counters.inc("misses")
+    return await _translate_async_flight.do(key, _translate_provider, text, target_lang)
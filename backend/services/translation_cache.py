@@ -0,0 +1,206 @@
+# backend/services/translation_cache.py
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services.metrics import Counters, Histogram
+
+logger = logging.getLogger("translation_cache")
+
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "true").lower() == "true"
+# จำนวนรายการสูงสุดใน LRU ของ process และอายุของคำแปลใน Mongo (วินาที)
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "4096"))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+# อายุของคำแปลใน LRU ของ process (วินาที): worker อื่นจะเห็นการ invalidate ภายในเวลานี้
+TRANSLATION_CACHE_LOCAL_TTL = int(os.getenv("TRANSLATION_CACHE_LOCAL_TTL", "300"))
+# ชั้นที่สองเก็บใน collection translation_cache เพื่อแชร์ข้าม worker / restart
+TRANSLATION_CACHE_MONGO = os.getenv("TRANSLATION_CACHE_MONGO", "true").lower() == "true"
+# เมื่อเชื่อม Mongo ไม่ได้ ให้ข้ามชั้นนี้ไปช่วงหนึ่ง (วินาที) แทนที่จะรอ timeout ทุกครั้ง
+MONGO_RETRY_AFTER = 30
+
+CacheKey = Tuple[str, str, str]
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def make_key(text: str, source: str, target: str) -> CacheKey:
+    return normalize_text(text), source.lower(), target.lower()
+
+
+def _doc_id(key: CacheKey) -> str:
+    text, source, target = key
+    return f"{source}|{target}|{text}"
+
+
+class TranslationCache:
+    """
+    cache คำแปลสองชั้น: LRU ในหน่วยความจำ (มี TTL) อยู่หน้า collection translation_cache ใน Mongo
+    ใช้ pymongo แบบ sync เพราะ translate_text ถูกเรียกจาก thread pool อยู่แล้ว
+    """
+
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES,
+                 ttl: int = TRANSLATION_CACHE_TTL,
+                 use_mongo: bool = TRANSLATION_CACHE_MONGO,
+                 local_ttl: int = TRANSLATION_CACHE_LOCAL_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # ไม่มี Mongo = LRU เป็นชั้นเดียว จึงใช้อายุเต็ม
+        self.local_ttl = min(local_ttl, ttl) if use_mongo else ttl
+        self.use_mongo = use_mongo
+        self._entries: "OrderedDict[CacheKey, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._collection = None
+        self._collection_lock = threading.Lock()
+        self._mongo_retry_at = 0.0
+        self.counters = Counters("hits", "mongo_hits", "misses", "expired", "evictions", "invalidations", "errors")
+        self.mongo_latency_ms = Histogram()
+        self.upstream_latency_ms = Histogram()
+
+    def _mongo_available(self) -> bool:
+        return self.use_mongo and time.monotonic() >= self._mongo_retry_at
+
+    def _mongo_failed(self, action: str, error: Exception) -> None:
+        self.counters.inc("errors")
+        self._mongo_retry_at = time.monotonic() + MONGO_RETRY_AFTER
+        logger.error(f"Mongo translation cache {action} failed: {error}")
+
+    def _get_collection(self):
+        if self._collection is None:
+            with self._collection_lock:
+                if self._collection is None:
+                    from pymongo import MongoClient
+
+                    from backend.database import MONGODB_URI
+
+                    collection = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=2000)["snaptranslate"].translation_cache
+                    # Mongo ลบเอกสารที่หมดอายุเองผ่าน TTL index
+                    collection.create_index("expires_at", expireAfterSeconds=0)
+                    self._collection = collection
+        return self._collection
+
+    def get_local(self, key: CacheKey) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            translated, expires_at = item
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.counters.inc("expired")
+                return None
+            self._entries.move_to_end(key)
+        return translated
+
+    def put_local(self, key: CacheKey, translated: str, expires_at: Optional[float] = None) -> None:
+        local_expires_at = time.time() + self.local_ttl
+        if expires_at is not None:
+            local_expires_at = min(local_expires_at, expires_at)
+        with self._lock:
+            self._entries[key] = (translated, local_expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.inc("evictions")
+
+    def get(self, text: str, source: str, target: str) -> Optional[str]:
+        key = make_key(text, source, target)
+        translated = self.get_local(key)
+        if translated is not None:
+            self.counters.inc("hits")
+            return translated
+        if self._mongo_available():
+            started = time.perf_counter()
+            try:
+                doc = self._get_collection().find_one({"_id": _doc_id(key)})
+                if doc and doc["expires_at"] > datetime.utcnow():
+                    self.counters.inc("mongo_hits")
+                    expires_in = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+                    self.put_local(key, doc["translated"], time.time() + expires_in)
+                    return doc["translated"]
+            except Exception as e:
+                self._mongo_failed("lookup", e)
+            finally:
+                self.mongo_latency_ms.observe((time.perf_counter() - started) * 1000)
+        self.counters.inc("misses")
+        return None
+
+    def put(self, text: str, source: str, target: str, translated: str) -> None:
+        key = make_key(text, source, target)
+        self.put_local(key, translated)
+        if self._mongo_available():
+            now = datetime.utcnow()
+            try:
+                self._get_collection().update_one(
+                    {"_id": _doc_id(key)},
+                    {"$set": {
+                        "text": key[0],
+                        "source": key[1],
+                        "target": key[2],
+                        "translated": translated,
+                        "updated_at": now,
+                        "expires_at": now + timedelta(seconds=self.ttl),
+                    }},
+                    upsert=True,
+                )
+            except Exception as e:
+                self._mongo_failed("write", e)
+
+    def invalidate(self, text: Optional[str] = None, target: Optional[str] = None) -> Dict[str, Any]:
+        """
+        ลบคำแปลออกจาก LRU ของ process นี้และจาก Mongo: ระบุ text และ/หรือ target เพื่อเจาะจง ไม่ระบุเลย = ล้างทั้งหมด
+        worker อื่นยังอาจตอบคำแปลเดิมจาก LRU ของตัวเองได้ไม่เกิน local_ttl วินาที
+        """
+        normalized = normalize_text(text) if text is not None else None
+        target = target.lower() if target is not None else None
+
+        def matches(key: CacheKey) -> bool:
+            return (normalized is None or key[0] == normalized) and (target is None or key[2] == target)
+
+        with self._lock:
+            doomed = [key for key in self._entries if matches(key)]
+            for key in doomed:
+                del self._entries[key]
+        removed_mongo: Optional[int] = None
+        if self.use_mongo:
+            query: Dict[str, Any] = {}
+            if normalized is not None:
+                query["text"] = normalized
+            if target is not None:
+                query["target"] = target
+            try:
+                removed_mongo = self._get_collection().delete_many(query).deleted_count
+            except Exception as e:
+                self._mongo_failed("invalidation", e)
+        self.counters.inc("invalidations", max(len(doomed), removed_mongo or 0))
+        return {
+            "removed_local": len(doomed),
+            "removed_mongo": removed_mongo,
+            # เวลาสูงสุดที่ worker อื่นยังอาจตอบคำแปลเดิม
+            "other_workers_stale_for_seconds": self.local_ttl,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.counters.get("hits") + self.counters.get("mongo_hits") + self.counters.get("misses")
+        hits = self.counters.get("hits") + self.counters.get("mongo_hits")
+        return self.counters.snapshot({
+            "enabled": TRANSLATION_CACHE_ENABLED,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "local_ttl_seconds": self.local_ttl,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "mongo_latency_ms": self.mongo_latency_ms.snapshot(),
+            "upstream_latency_ms": self.upstream_latency_ms.snapshot(),
+        })
+
+
+translation_cache = TranslationCache()
@@ -0,0 +1,130 @@
+# backend/services/translation_pipeline.py
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from backend.config.languages import languages
+from backend.services.label_pack import label_pack
+from backend.services.translate import translate_text_async
+from backend.services.tts import defer_tts, generate_tts
+from backend.services.tts_cache import TTS_MODE
+
+logger = logging.getLogger("translation_pipeline")
+
+# จำนวนงานแปล + TTS ที่รันพร้อมกันได้สูงสุดต่อ worker และ timeout ต่อภาษา (วินาที)
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "8"))
+FANOUT_LANG_TIMEOUT = float(os.getenv("FANOUT_LANG_TIMEOUT", "10"))
+# วัตถุรองในภาพ (ไม่ใช่ label หลัก): จำนวน label สูงสุดต่อภาพ, งานพร้อมกันสูงสุด (semaphore แยก
+# จึงไม่แย่งคิวกับ label หลัก) และภาษาที่แปล: th = เฉพาะภาษาไทย, all = ทุกภาษาที่ขอเหมือน label หลัก
+FANOUT_EXTRA_LABELS_MAX = int(os.getenv("FANOUT_EXTRA_LABELS_MAX", "2"))
+FANOUT_EXTRA_CONCURRENCY = int(os.getenv("FANOUT_EXTRA_CONCURRENCY", "2"))
+FANOUT_EXTRA_LANGS = os.getenv("FANOUT_EXTRA_LANGS", "th").lower()
+
+_semaphores: Dict[bool, asyncio.Semaphore] = {}
+
+
+def _get_semaphore(extra: bool = False) -> asyncio.Semaphore:
+    if extra not in _semaphores:
+        _semaphores[extra] = asyncio.Semaphore(FANOUT_EXTRA_CONCURRENCY if extra else FANOUT_CONCURRENCY)
+    return _semaphores[extra]
+
+
+async def _translate_and_speak(text: str, lang_code: str) -> Dict[str, str]:
+    translated = await translate_text_async(text, lang_code)
+    speak = defer_tts if TTS_MODE == "lazy" else generate_tts
+    audio_url = await asyncio.to_thread(speak, translated, lang_code)
+    return {"translated": translated, "audio_url": audio_url}
+
+
+async def _limited_translate_and_speak(text: str, lang_code: str, extra: bool) -> Dict[str, str]:
+    async with _get_semaphore(extra):
+        return await _translate_and_speak(text, lang_code)
+
+
+async def translate_and_speak(text: str, lang_code: str, timeout: Optional[float] = None,
+                              extra: bool = False) -> Dict[str, str]:
+    """
+    แปลข้อความ (async provider) + สร้างเสียง (thread pool) ของภาษาเดียวโดยไม่บล็อก event loop
+    label ที่มีอยู่ใน label pack จะตอบจาก pack ทันทีโดยไม่เรียก network
+    timeout นับรวมเวลารอคิว (semaphore ที่ใช้ร่วมกันทั้ง worker) ด้วย ภาษาที่รอคิวนานเกินจะไม่หน่วง response
+    """
+    packed = label_pack.lookup(text, lang_code)
+    if packed:
+        return packed
+    return await asyncio.wait_for(
+        _limited_translate_and_speak(text, lang_code, extra),
+        timeout=timeout or FANOUT_LANG_TIMEOUT,
+    )
+
+
+async def _run_one(text: str, language: str, lang_code: str, extra: bool = False) -> Dict[str, Any]:
+    try:
+        item = await translate_and_speak(text, lang_code, extra=extra)
+        return {"original": text, "language": language, "lang_code": lang_code, "ok": True, **item}
+    except asyncio.TimeoutError:
+        logger.warning(f"แปลภาษา {language} เกินเวลา {FANOUT_LANG_TIMEOUT}s")
+        return {"original": text, "language": language, "lang_code": lang_code, "ok": False, "error": "timeout"}
+    except Exception as e:
+        logger.error(f"แปลภาษา {language} ไม่สำเร็จ: {e}")
+        return {"original": text, "language": language, "lang_code": lang_code, "ok": False, "error": str(e)}
+
+
+def resolve_languages(langs_list: List[str]) -> List[Dict[str, str]]:
+    """
+    แปลงชื่อภาษา (ไทย) เป็นรหัสภาษา ตัดรายการที่ไม่รู้จักหรือซ้ำออก
+    """
+    targets = []
+    seen = set()
+    for lang in langs_list:
+        lang_code = languages.get(lang)
+        if not lang_code:
+            logger.warning(f"ไม่พบรหัสภาษาสำหรับ: {lang}")
+            continue
+        if lang in seen:
+            continue
+        seen.add(lang)
+        targets.append({"language": lang, "lang_code": lang_code})
+    return targets
+
+
+def fanout_tasks(text: str, langs_list: List[str], extra: bool = False) -> List["asyncio.Task"]:
+    """
+    สร้าง task ของภาษาไทย (ตัวแรกเสมอ) และทุกภาษาที่ขอ ให้รันพร้อมกัน
+    extra = label ของวัตถุรอง: ใช้คิวแยก และแปลเฉพาะภาษาไทยเว้นแต่ FANOUT_EXTRA_LANGS=all
+    """
+    targets = [{"language": "th", "lang_code": "th"}]
+    if not extra or FANOUT_EXTRA_LANGS == "all":
+        targets += resolve_languages(langs_list)
+    return [
+        asyncio.ensure_future(_run_one(text, t["language"], t["lang_code"], extra))
+        for t in targets
+    ]
+
+
+async def run_language_fanout(text: str, langs_list: List[str], extra: bool = False) -> Dict[str, Any]:
+    """
+    แปล + TTS ภาษาไทยและทุกภาษาที่ขอพร้อมกัน
+    ภาษาที่ล้มเหลวหรือช้าเกินจะถูกรายงานใน failed_languages แทนที่จะทำให้ทั้ง request ล้ม
+    """
+    outcomes = await asyncio.gather(*fanout_tasks(text, langs_list, extra))
+    th, others = outcomes[0], outcomes[1:]
+
+    result: Dict[str, Any] = {
+        "original": text,
+        "th": th.get("translated"),
+        "audio_url": th.get("audio_url"),
+        "translations": [],
+        "failed_languages": [],
+    }
+    for outcome in outcomes:
+        if not outcome["ok"]:
+            result["failed_languages"].append({"language": outcome["language"], "error": outcome["error"]})
+    for outcome in others:
+        if outcome["ok"]:
+            result["translations"].append({
+                "language": outcome["language"],
+                "translated": outcome["translated"],
+                "audio_url": outcome["audio_url"],
+            })
+    return result
@@ -0,0 +1,203 @@
+# backend/services/translation_providers.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import httpx
+
+from backend.services.metrics import Counters, Histogram
+
+logger = logging.getLogger("translation_providers")
+
+# google_http = Google Translate ผ่าน httpx แบบ async (connection pool แบบ keep-alive)
+# deep_translator = ไลบรารีเดิม (sync) รันใน thread, fake = ไม่ต่อ network (สำหรับทดสอบ / benchmark)
+TRANSLATION_PROVIDER = os.getenv("TRANSLATION_PROVIDER", "google_http").lower()
+# deadline ต่อการแปลหนึ่งครั้ง (วินาที) รวมการยิงซ้ำแล้ว
+TRANSLATION_TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", "4"))
+# hedged retry: ยิงคำขอที่สองเมื่อคำขอแรกยังไม่ตอบภายใน p95 ของ latency ที่ผ่านมา
+TRANSLATION_HEDGE = os.getenv("TRANSLATION_HEDGE", "true").lower() == "true"
+TRANSLATION_HEDGE_DEFAULT_MS = float(os.getenv("TRANSLATION_HEDGE_DEFAULT_MS", "800"))
+TRANSLATION_HEDGE_MIN_MS = float(os.getenv("TRANSLATION_HEDGE_MIN_MS", "100"))
+TRANSLATION_HTTP_MAX_CONNECTIONS = int(os.getenv("TRANSLATION_HTTP_MAX_CONNECTIONS", "32"))
+FAKE_TRANSLATION_LATENCY_MS = float(os.getenv("FAKE_TRANSLATION_LATENCY_MS", "0"))
+
+GOOGLE_TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"
+# จำนวน latency ล่าสุดที่ใช้คำนวณ p95 และจำนวนขั้นต่ำก่อนเชื่อค่า p95
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+
+
+class TranslationProvider:
+    """
+    interface ของผู้ให้บริการแปล: translate เป็น coroutine, close ปิด resource ที่ถือไว้
+    """
+
+    name = "base"
+
+    async def translate(self, text: str, target_lang: str, source_lang: str = "auto") -> str:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class GoogleHttpProvider(TranslationProvider):
+    name = "google_http"
+
+    def __init__(self, timeout: float = TRANSLATION_TIMEOUT,
+                 max_connections: int = TRANSLATION_HTTP_MAX_CONNECTIONS):
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def translate(self, text: str, target_lang: str, source_lang: str = "auto") -> str:
+        response = await self._client.get(GOOGLE_TRANSLATE_URL, params={
+            "client": "gtx",
+            "sl": source_lang,
+            "tl": target_lang,
+            "dt": "t",
+            "q": text,
+        })
+        response.raise_for_status()
+        # [[["แปลแล้ว", "ต้นฉบับ", ...], ...], ...] ข้อความยาวจะถูกแบ่งเป็นหลายท่อน
+        segments = response.json()[0] or []
+        return "".join(segment[0] for segment in segments if segment and segment[0])
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class DeepTranslatorProvider(TranslationProvider):
+    name = "deep_translator"
+
+    async def translate(self, text: str, target_lang: str, source_lang: str = "auto") -> str:
+        from deep_translator import GoogleTranslator
+
+        return await asyncio.to_thread(
+            lambda: GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+        )
+
+
+class FakeProvider(TranslationProvider):
+    name = "fake"
+
+    def __init__(self, latency_ms: float = FAKE_TRANSLATION_LATENCY_MS):
+        self.latency_ms = latency_ms
+
+    async def translate(self, text: str, target_lang: str, source_lang: str = "auto") -> str:
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return f"[{target_lang}] {text}"
+
+
+PROVIDERS = {
+    GoogleHttpProvider.name: GoogleHttpProvider,
+    DeepTranslatorProvider.name: DeepTranslatorProvider,
+    FakeProvider.name: FakeProvider,
+}
+
+
+class HedgedTranslator:
+    """
+    ห่อ provider ด้วย deadline ต่อครั้งและ hedged retry:
+    ถ้าคำขอแรกยังไม่ตอบภายใน p95 จะยิงคำขอที่สองขนานกัน แล้วใช้คำตอบที่สำเร็จก่อน
+    """
+
+    def __init__(self, provider: TranslationProvider, timeout: float = TRANSLATION_TIMEOUT,
+                 hedge: bool = TRANSLATION_HEDGE):
+        self.provider = provider
+        self.timeout = timeout
+        self.hedge = hedge
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.latency_ms = Histogram()
+        self.counters = Counters("requests", "hedged", "hedge_wins", "timeouts", "errors")
+
+    def hedge_delay_ms(self) -> float:
+        if len(self._latencies) < LATENCY_MIN_SAMPLES:
+            return TRANSLATION_HEDGE_DEFAULT_MS
+        ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(TRANSLATION_HEDGE_MIN_MS, p95)
+
+    async def _attempt(self, text: str, target_lang: str, source_lang: str) -> str:
+        started = time.perf_counter()
+        translated = await self.provider.translate(text, target_lang, source_lang)
+        elapsed = (time.perf_counter() - started) * 1000
+        self._latencies.append(elapsed)
+        self.latency_ms.observe(elapsed)
+        return translated
+
+    async def _hedged(self, text: str, target_lang: str, source_lang: str) -> str:
+        first = asyncio.ensure_future(self._attempt(text, target_lang, source_lang))
+        attempts: List["asyncio.Future"] = [first]
+        try:
+            if self.hedge:
+                done, _ = await asyncio.wait(attempts, timeout=self.hedge_delay_ms() / 1000)
+                if not done:
+                    self.counters.inc("hedged")
+                    attempts.append(asyncio.ensure_future(self._attempt(text, target_lang, source_lang)))
+            error: Optional[BaseException] = None
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not first:
+                            self.counters.inc("hedge_wins")
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    async def translate(self, text: str, target_lang: str, source_lang: str = "auto") -> str:
+        self.counters.inc("requests")
+        try:
+            return await asyncio.wait_for(self._hedged(text, target_lang, source_lang), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.counters.inc("timeouts")
+            raise
+        except Exception:
+            self.counters.inc("errors")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return self.counters.snapshot({
+            "provider": self.provider.name,
+            "timeout_s": self.timeout,
+            "hedge": self.hedge,
+            "hedge_delay_ms": round(self.hedge_delay_ms(), 1),
+            "latency_ms": self.latency_ms.snapshot(),
+        })
+
+
+_translator: Optional[HedgedTranslator] = None
+
+
+def get_translator() -> HedgedTranslator:
+    global _translator
+    if _translator is None:
+        provider_cls = PROVIDERS.get(TRANSLATION_PROVIDER)
+        if provider_cls is None:
+            logger.warning(f"ไม่รู้จัก TRANSLATION_PROVIDER={TRANSLATION_PROVIDER} ใช้ google_http แทน")
+            provider_cls = GoogleHttpProvider
+        _translator = HedgedTranslator(provider_cls())
+        logger.info(f"Translation provider: {_translator.provider.name}")
+    return _translator
+
+
+def translator_stats() -> Optional[Dict[str, Any]]:
+    return _translator.stats() if _translator else None
+
+
+async def close_translator() -> None:
+    global _translator
+    if _translator is not None:
+        await _translator.provider.close()
+        _translator = None
@@ -1,11 +1,102 @@
-from gtts import gTTS
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gtts import gTTS
+
+from backend.services.blob_storage import blob_storage
+from backend.services.singleflight import SingleFlight
+from backend.services.tts_cache import TTS_SLOW, TTS_TLD, tts_cache, tts_key
+
+# คำขอเสียงของข้อความเดียวกันที่มาพร้อมกันจะสร้างไฟล์ mp3 เพียงครั้งเดียว
+_tts_flight = SingleFlight("tts")
+
+# pending record ของโหมด lazy ถูกส่งขึ้น blob storage เบื้องหลัง /analyze จึงไม่ต้องรอ round trip ของ S3
+_pending_uploader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts_pending")
+_pending_queued = set()
+_pending_lock = threading.Lock()
+
+
+def _pending_blob(key):
+    return f"pending/{key}.json"
+
+
+def _publish_pending(key, payload):
+    try:
+        blob_storage.put_bytes("tts", _pending_blob(key), payload, "application/json")
+    finally:
+        with _pending_lock:
+            _pending_queued.discard(key)
+
+
+def _fetch_shared(key, lang_code=None):
+    """
+    ดึงไฟล์ที่เครื่องอื่นสร้างไว้แล้วจาก blob storage มาไว้ใน cache local คืน path หรือ None
+    """
+    if not blob_storage.remote:
+        return None
+    path = blob_storage.fetch("tts", tts_cache.filename_for(key))
+    if path:
+        tts_cache.index.record(key, lang_code, os.path.getsize(path))
+    return path
+
+
+def _synthesize(key, text, lang_code):
+    # worker อื่นอาจสร้างไฟล์เสร็จไปแล้วระหว่างรอ
+    if os.path.exists(tts_cache.path_for(key)) or _fetch_shared(key, lang_code):
+        return
+    tts = gTTS(text, lang=lang_code, tld=TTS_TLD, slow=TTS_SLOW)
+    tts_cache.store(key, lang_code, tts.save)
+    blob_storage.publish("tts", tts_cache.filename_for(key), "audio/mpeg")
+
 
 def generate_tts(text, lang_code):
-    os.makedirs("tts_cache", exist_ok=True)
-    filename = f"{lang_code}_{abs(hash(text))}.mp3"
-    path = os.path.join("tts_cache", filename)
-    if not os.path.exists(path):
-        tts = gTTS(text, lang=lang_code)
-        tts.save(path)
-    return f"/audio/{filename}"
+    key = tts_key(text, lang_code)
+    if not tts_cache.lookup(key):
+        _tts_flight.do(key, _synthesize, key, text, lang_code)
+    return tts_cache.url_for(key)
+
+
+def defer_tts(text, lang_code):
+    """
+    โหมด lazy: คืน URL ที่แน่นอนทันที แล้วค่อยสร้างไฟล์เมื่อมีการ GET ครั้งแรก (synthesize_pending)
+    """
+    key = tts_key(text, lang_code)
+    if not tts_cache.lookup(key):
+        tts_cache.index.add_pending(key, text, lang_code)
+        # เมื่อใช้ blob storage ร่วมกัน GET อาจไปตกที่เครื่องอื่น จึงเก็บข้อมูลที่ต้องใช้สร้างเสียงไว้ด้วย (เบื้องหลัง)
+        if blob_storage.remote:
+            with _pending_lock:
+                queued = key in _pending_queued
+                _pending_queued.add(key)
+            if not queued:
+                payload = json.dumps({"text": text, "lang": lang_code}, ensure_ascii=False).encode("utf-8")
+                _pending_uploader.submit(_publish_pending, key, payload)
+        tts_cache.counters.inc("lazy_deferred")
+    return tts_cache.url_for(key)
+
+
+def synthesize_pending(key):
+    """
+    หาไฟล์ของ URL แบบ lazy: ดึงจาก blob storage ถ้าเครื่องอื่นสร้างไว้แล้ว ไม่เช่นนั้นสร้างตอนนี้
+    คืน path ของไฟล์ หรือ None ถ้า key นี้ไม่เคยถูกออก URL
+    """
+    pending = tts_cache.index.get_pending(key)
+    shared_pending = False
+    if pending is None:
+        path = _fetch_shared(key)
+        if path:
+            return path
+        data = blob_storage.get_bytes("tts", _pending_blob(key))
+        if data is None:
+            return None
+        item = json.loads(data)
+        pending, shared_pending = (item["text"], item["lang"]), True
+    text, lang_code = pending
+    _tts_flight.do(key, _synthesize, key, text, lang_code)
+    tts_cache.index.remove_pending(key)
+    if shared_pending or blob_storage.remote:
+        blob_storage.delete("tts", _pending_blob(key))
+    tts_cache.counters.inc("lazy_synthesized")
+    return tts_cache.path_for(key)
@@ -0,0 +1,341 @@
+# backend/services/tts_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.services.metrics import Counters
+
+logger = logging.getLogger("tts_cache")
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+# การตั้งค่าเสียงของ gTTS ที่เป็นส่วนหนึ่งของ key (เปลี่ยนค่า = ไฟล์ใหม่)
+TTS_TLD = os.getenv("TTS_TLD", "com")
+TTS_SLOW = os.getenv("TTS_SLOW", "false").lower() == "true"
+# จำนวนการเข้าถึงที่สะสมไว้ในหน่วยความจำก่อนเขียนลง index
+TTS_INDEX_FLUSH_EVERY = int(os.getenv("TTS_INDEX_FLUSH_EVERY", "64"))
+# งบพื้นที่ดิสก์ของ cache (ไบต์), นโยบายการลบ (lru = เข้าถึงนานที่สุด, lfu = ถูกเล่นน้อยที่สุด)
+# และรอบการทำงานของ janitor (วินาที) ซึ่งลบจนเหลือ TTS_CACHE_LOW_WATER ของงบ
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+TTS_CACHE_LOW_WATER = float(os.getenv("TTS_CACHE_LOW_WATER", "0.9"))
+TTS_EVICTION_POLICY = os.getenv("TTS_EVICTION_POLICY", "lru").lower()
+TTS_JANITOR_INTERVAL = float(os.getenv("TTS_JANITOR_INTERVAL", "300"))
+# eager = สร้างเสียงทุกภาษาก่อนตอบ /analyze (ค่าเริ่มต้น), lazy = ตอบ URL ทันทีแล้วสร้างเมื่อมีการ GET ครั้งแรก
+# (โหมด lazy: URL ที่ไม่ถูกเปิดภายใน TTS_PENDING_TTL จะตอบ 404 จนกว่าจะวิเคราะห์วลีนั้นอีกครั้ง)
+TTS_MODE = os.getenv("TTS_MODE", "eager").lower()
+# URL แบบ lazy ที่ไม่ถูกเปิดภายในเวลานี้ (วินาที) ถือว่าไม่เคยถูกเล่น และถูกลบออกจากรายการรอ
+TTS_PENDING_TTL = float(os.getenv("TTS_PENDING_TTL", str(24 * 3600)))
+INDEX_NAME = "index.sqlite3"
+EVICTION_BATCH = 500
+
+_FILENAME_RE = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})\.mp3$")
+
+_EVICTION_ORDER = {
+    "lru": "last_access ASC",
+    "lfu": "plays ASC, hits ASC, last_access ASC",
+}
+
+
+def tts_key(text: str, lang_code: str, tld: str = TTS_TLD, slow: bool = TTS_SLOW) -> str:
+    """
+    sha256 ของข้อความ + ภาษา + การตั้งค่าเสียง (คงที่ข้าม process ต่างจาก hash() ของ Python)
+    """
+    payload = json.dumps([text, lang_code, tld, slow], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSIndex:
+    """
+    index (sqlite, WAL) ของไฟล์ใน cache: ขนาด เวลาที่สร้าง เวลาเข้าถึงล่าสุด และจำนวนครั้งที่เข้าถึง
+    ใช้ร่วมกันได้หลาย worker; การเข้าถึงจะถูกสะสมไว้แล้วเขียนเป็นชุด
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._touches: Dict[str, List[int]] = {}
+        self._last_access: Dict[str, float] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, lang TEXT, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "plays" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN plays INTEGER NOT NULL DEFAULT 0")
+            # เสียงแบบ lazy ที่ออก URL ไปแล้วแต่ยังไม่ถูกสร้าง (ใช้ร่วมกันทุก worker)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL, lang TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def record(self, key: str, lang: str, size: int) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO entries (key, lang, size, created_at, last_access, hits) VALUES (?, ?, ?, ?, ?, 0)"
+                " ON CONFLICT(key) DO UPDATE SET size = excluded.size, last_access = excluded.last_access",
+                (key, lang, size, now, now),
+            )
+            conn.commit()
+
+    def touch(self, key: str, played: bool = False) -> None:
+        # hits = ถูกใช้ซ้ำ (ทั้งตอนสร้าง URL และตอนเสิร์ฟ), plays = ถูกเสิร์ฟให้ผู้ใช้จริง
+        with self._lock:
+            counts = self._touches.setdefault(key, [0, 0])
+            counts[0] += 1
+            counts[1] += int(played)
+            self._last_access[key] = time.time()
+            pending = len(self._touches)
+        if pending >= TTS_INDEX_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._touches:
+                return
+            rows = [(self._last_access[key], hits, plays, key) for key, (hits, plays) in self._touches.items()]
+            self._touches.clear()
+            self._last_access.clear()
+            try:
+                conn = self._connect()
+                conn.executemany(
+                    "UPDATE entries SET last_access = MAX(last_access, ?), hits = hits + ?, plays = plays + ?"
+                    " WHERE key = ?",
+                    rows,
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"TTS index flush failed: {e}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT lang, size, created_at, last_access, hits, plays FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("lang", "size", "created_at", "last_access", "hits", "plays"), row))
+
+    def add_pending(self, key: str, text: str, lang: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR IGNORE INTO pending (key, text, lang, created_at) VALUES (?, ?, ?, ?)",
+                (key, text, lang, time.time()),
+            )
+            conn.commit()
+
+    def get_pending(self, key: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            return self._connect().execute("SELECT text, lang FROM pending WHERE key = ?", (key,)).fetchone()
+
+    def remove_pending(self, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM pending WHERE key = ?", (key,))
+            conn.commit()
+
+    def expire_pending(self, older_than: float) -> int:
+        with self._lock:
+            conn = self._connect()
+            removed = conn.execute("DELETE FROM pending WHERE created_at < ?", (older_than,)).rowcount
+            conn.commit()
+        return removed
+
+    def usage(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._connect()
+            never_played = conn.execute("SELECT COUNT(*) FROM entries WHERE plays = 0").fetchone()[0]
+            pending = conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+        return {"never_played": never_played, "pending": pending}
+
+    def eviction_candidates(self, policy: str, limit: int) -> List[Tuple[str, int, int]]:
+        order = _EVICTION_ORDER.get(policy, _EVICTION_ORDER["lru"])
+        with self._lock:
+            return self._connect().execute(
+                f"SELECT key, size, plays FROM entries ORDER BY {order} LIMIT ?", (limit,)
+            ).fetchall()
+
+    def remove(self, keys: List[str]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+            conn.commit()
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": size}
+
+
+class TTSCache:
+    """
+    cache ไฟล์เสียงแบบ content-addressed: ชื่อไฟล์มาจาก tts_key จึงใช้ร่วมกันได้ทุก worker และอยู่รอดข้าม restart
+    เขียนไฟล์ชั่วคราวแล้ว rename เสมอ จึงไม่มีการเสิร์ฟไฟล์ที่เขียนไม่เสร็จ
+    ไฟล์อยู่ในโฟลเดอร์ย่อยตาม prefix ของ hash (ab/cd/abcd....mp3) และถูกจำกัดขนาดรวมด้วย enforce_budget
+    """
+
+    def __init__(self, root: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES,
+                 policy: str = TTS_EVICTION_POLICY):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.index = TTSIndex(os.path.join(root, INDEX_NAME))
+        self.counters = Counters(
+            "hits", "misses", "writes", "write_errors",
+            "evictions", "evicted_bytes", "evicted_never_played", "janitor_runs", "legacy_removed",
+            "lazy_deferred", "lazy_synthesized", "lazy_expired",
+        )
+        self.last_janitor_ms: Optional[float] = None
+        self._legacy_swept = False
+
+    def filename_for(self, key: str) -> str:
+        return f"{key[:2]}/{key[2:4]}/{key}.mp3"
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, self.filename_for(key))
+
+    def url_for(self, key: str) -> str:
+        return f"/audio/{self.filename_for(key)}"
+
+    @staticmethod
+    def key_from_filename(filename: str) -> Optional[str]:
+        """
+        แปลง path ใน URL (ab/cd/<sha256>.mp3) กลับเป็น key; คืน None ถ้ารูปแบบไม่ถูกต้อง
+        """
+        match = _FILENAME_RE.match(filename)
+        if not match or not match.group(3).startswith(match.group(1) + match.group(2)):
+            return None
+        return match.group(3)
+
+    def lookup(self, key: str, played: bool = False) -> Optional[str]:
+        path = self.path_for(key)
+        if os.path.exists(path):
+            self.counters.inc("hits")
+            self.index.touch(key, played)
+            return path
+        self.counters.inc("misses")
+        return None
+
+    def store(self, key: str, lang: str, write: Callable[[str], None]) -> str:
+        """
+        เรียก write(tmp_path) ให้เขียนไฟล์ แล้ว rename เข้าที่แบบ atomic และบันทึกลง index
+        """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self.counters.inc("write_errors")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.counters.inc("writes")
+        self.index.record(key, lang, os.path.getsize(path))
+        return path
+
+    def _sweep_legacy(self) -> None:
+        # ไฟล์ชื่อแบบเดิม ({lang}_{hash()}.mp3) ที่ root ไม่มีทางถูกใช้อีก
+        for name in os.listdir(self.root):
+            if name.endswith(".mp3") and os.path.isfile(os.path.join(self.root, name)):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                    self.counters.inc("legacy_removed")
+                except OSError:
+                    pass
+        self._legacy_swept = True
+
+    def enforce_budget(self) -> int:
+        """
+        ลบไฟล์ตามนโยบาย (LRU/LFU) จนขนาดรวมไม่เกิน low-water mark ของงบ คืนจำนวนไฟล์ที่ลบ
+        """
+        started = time.perf_counter()
+        os.makedirs(self.root, exist_ok=True)
+        self.index.flush()
+        if not self._legacy_swept:
+            self._sweep_legacy()
+        self.counters.inc("lazy_expired", self.index.expire_pending(time.time() - TTS_PENDING_TTL))
+        used = self.index.totals()["bytes"]
+        target = int(self.max_bytes * TTS_CACHE_LOW_WATER)
+        evicted = 0
+        while used > self.max_bytes or (evicted and used > target):
+            candidates = self.index.eviction_candidates(self.policy, EVICTION_BATCH)
+            if not candidates:
+                break
+            doomed = []
+            for key, size, plays in candidates:
+                if used <= target:
+                    break
+                try:
+                    os.remove(self.path_for(key))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"ลบไฟล์เสียง {key} ไม่สำเร็จ: {e}")
+                    continue
+                doomed.append(key)
+                used -= size
+                self.counters.inc("evicted_bytes", size)
+                if not plays:
+                    self.counters.inc("evicted_never_played")
+            if not doomed:
+                break
+            self.index.remove(doomed)
+            evicted += len(doomed)
+        self.counters.inc("evictions", evicted)
+        self.counters.inc("janitor_runs")
+        self.last_janitor_ms = round((time.perf_counter() - started) * 1000, 1)
+        if evicted:
+            logger.info(f"TTS cache janitor: ลบ {evicted} ไฟล์ เหลือ {used} ไบต์")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        self.index.flush()
+        try:
+            totals = {**self.index.totals(), **self.index.usage()}
+        except sqlite3.Error as e:
+            totals = {"error": str(e)}
+        return self.counters.snapshot({
+            **totals,
+            "max_bytes": self.max_bytes,
+            "policy": self.policy,
+            "mode": TTS_MODE,
+            "last_janitor_ms": self.last_janitor_ms,
+        })
+
+
+tts_cache = TTSCache()
+
+
+async def run_tts_janitor(interval: float = TTS_JANITOR_INTERVAL) -> None:
+    """
+    งานเบื้องหลัง (เริ่มจาก lifespan) ที่คุมขนาด cache เป็นระยะ
+    """
+    while True:
+        try:
+            await asyncio.to_thread(tts_cache.enforce_budget)
+        except Exception as e:
+            logger.error(f"TTS cache janitor failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,220 @@
+# backend/services/tts_warmup.py
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from backend.config.languages import languages
+from backend.services.label_pack import LABEL_PACK_URL_PREFIX
+from backend.services.metrics import Counters
+from backend.services.translate import translate_text_async
+from backend.services.tts import generate_tts
+from backend.services.tts_cache import tts_cache, tts_key
+
+logger = logging.getLogger("tts_warmup")
+
+# จำนวนวลียอดนิยมที่จะสร้างเสียงไว้ล่วงหน้า และอัตราการเรียก gTTS สูงสุด (ครั้ง/วินาที)
+TTS_WARMUP_TOP_N = int(os.getenv("TTS_WARMUP_TOP_N", "200"))
+TTS_WARMUP_RATE = float(os.getenv("TTS_WARMUP_RATE", "2"))
+# ภาษาที่ต้องมีเสียงเสมอสำหรับวลียอดนิยม (นอกเหนือจากภาษาที่เคยถูกขอสำหรับวลีนั้น)
+TTS_WARMUP_LANGUAGES = [code.strip() for code in os.getenv("TTS_WARMUP_LANGUAGES", "th").split(",") if code.strip()]
+# รันตอน startup และ/หรือทุก ๆ TTS_WARMUP_INTERVAL วินาที (0 = ไม่ตั้งเวลา)
+TTS_WARMUP_ON_STARTUP = os.getenv("TTS_WARMUP_ON_STARTUP", "false").lower() == "true"
+TTS_WARMUP_INTERVAL = float(os.getenv("TTS_WARMUP_INTERVAL", "0"))
+
+
+def fanout_phrases(result: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    ดึงวลี (ข้อความต้นฉบับ, ภาษา, คำแปล) จากผลของ run_language_fanout
+    วลีที่ตอบจาก label pack มีเสียงอยู่แล้วจึงไม่นับ
+    """
+    phrases = []
+    if result.get("th"):
+        phrases.append({"original": result["original"], "lang_code": "th",
+                        "translated": result["th"], "audio_url": result.get("audio_url") or ""})
+    for item in result.get("translations", []):
+        lang_code = languages.get(item["language"])
+        if lang_code:
+            phrases.append({"original": result["original"], "lang_code": lang_code,
+                            "translated": item["translated"], "audio_url": item.get("audio_url") or ""})
+    return phrases
+
+
+async def record_phrase_usage(db: AsyncIOMotorDatabase, phrases: List[Dict[str, str]]) -> None:
+    """
+    นับจำนวนครั้งที่แต่ละวลีถูกใช้ใน collection phrase_stats (bulk write ครั้งเดียว)
+    ล้มเหลวได้โดยไม่กระทบ request
+    """
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for phrase in phrases:
+        if phrase["audio_url"].startswith(LABEL_PACK_URL_PREFIX):
+            continue
+        doc_id = f"{phrase['lang_code']}|{phrase['original']}"
+        entry = grouped.setdefault(doc_id, {**phrase, "count": 0})
+        entry["count"] += 1
+    if not grouped:
+        return
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"_id": doc_id},
+            {
+                "$inc": {"count": entry["count"]},
+                "$set": {
+                    "original": entry["original"],
+                    "lang_code": entry["lang_code"],
+                    "translated": entry["translated"],
+                    "last_used": now,
+                },
+            },
+            upsert=True,
+        )
+        for doc_id, entry in grouped.items()
+    ]
+    try:
+        await db.phrase_stats.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to record phrase stats: {e}")
+
+
+# task ของการบันทึกสถิติที่ยังไม่เสร็จ (เก็บ reference ไว้ไม่ให้ task ถูก garbage collect ระหว่างรัน)
+_usage_tasks: Set["asyncio.Task"] = set()
+
+
+def record_phrase_usage_background(db: AsyncIOMotorDatabase, phrases: List[Dict[str, str]]) -> None:
+    """
+    บันทึก phrase_stats เบื้องหลังหลังส่ง response ข้อมูลนี้ใช้เฉพาะกับงาน warmup จึงไม่ต้องให้ผู้ใช้รอ
+    """
+    if not phrases:
+        return
+    task = asyncio.create_task(record_phrase_usage(db, phrases))
+    _usage_tasks.add(task)
+    task.add_done_callback(_usage_tasks.discard)
+
+
+class TTSWarmup:
+    """
+    สร้างเสียงของวลียอดนิยม (จาก phrase_stats) x ภาษา ลง TTS cache ล่วงหน้า
+    จำกัดอัตราการเรียก gTTS และรายงานความคืบหน้าผ่าน status()
+    """
+
+    def __init__(self, rate: float = TTS_WARMUP_RATE):
+        self.rate = rate
+        self.counters = Counters("runs", "generated", "already_cached", "failed")
+        self.state = "idle"
+        self.total = 0
+        self.done = 0
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional["asyncio.Task"] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def popular_phrases(self, db: AsyncIOMotorDatabase, top_n: int) -> List[Dict[str, str]]:
+        """
+        วลียอดนิยม top_n (รวม count ทุกภาษา) กับทุกภาษาที่เคยถูกขอ + TTS_WARMUP_LANGUAGES
+        """
+        pipeline = [
+            {"$group": {
+                "_id": "$original",
+                "total": {"$sum": "$count"},
+                "translations": {"$push": {"lang_code": "$lang_code", "translated": "$translated"}},
+            }},
+            {"$sort": {"total": -1}},
+            {"$limit": top_n},
+        ]
+        jobs = []
+        async for doc in db.phrase_stats.aggregate(pipeline):
+            known = {item["lang_code"]: item["translated"] for item in doc["translations"]}
+            for lang_code in TTS_WARMUP_LANGUAGES:
+                known.setdefault(lang_code, None)
+            for lang_code, translated in known.items():
+                jobs.append({"original": doc["_id"], "lang_code": lang_code, "translated": translated})
+        return jobs
+
+    async def run(self, db: AsyncIOMotorDatabase, top_n: int = TTS_WARMUP_TOP_N) -> Dict[str, Any]:
+        self.state = "running"
+        self.total = self.done = 0
+        self.started_at, self.finished_at, self.last_error = datetime.utcnow(), None, None
+        self.counters.inc("runs")
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        try:
+            jobs = await self.popular_phrases(db, top_n)
+            self.total = len(jobs)
+            logger.info(f"TTS warmup: {self.total} วลี x ภาษา จาก {top_n} วลียอดนิยม")
+            for job in jobs:
+                try:
+                    translated = job["translated"] or await translate_text_async(job["original"], job["lang_code"])
+                    if os.path.exists(tts_cache.path_for(tts_key(translated, job["lang_code"]))):
+                        self.counters.inc("already_cached")
+                    else:
+                        started = time.monotonic()
+                        await asyncio.to_thread(generate_tts, translated, job["lang_code"])
+                        self.counters.inc("generated")
+                        # จำกัดอัตราเฉพาะครั้งที่เรียก gTTS จริง
+                        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+                except Exception as e:
+                    self.counters.inc("failed")
+                    self.last_error = f"{job['original']} [{job['lang_code']}]: {e}"
+                self.done += 1
+            self.state = "finished"
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+        except Exception as e:
+            self.state = "failed"
+            self.last_error = str(e)
+            logger.error(f"TTS warmup failed: {e}")
+        finally:
+            self.finished_at = datetime.utcnow()
+        logger.info(f"TTS warmup {self.state}: {self.done}/{self.total}")
+        return self.status()
+
+    def start(self, db: AsyncIOMotorDatabase, top_n: int = TTS_WARMUP_TOP_N) -> bool:
+        """
+        เริ่มงาน warmup เบื้องหลัง คืน False ถ้ามีงานที่กำลังรันอยู่แล้ว
+        """
+        if self.running:
+            return False
+        self._task = asyncio.create_task(self.run(db, top_n))
+        return True
+
+    def cancel(self) -> None:
+        if self.running:
+            self._task.cancel()
+
+    def status(self) -> Dict[str, Any]:
+        return self.counters.snapshot({
+            "state": self.state,
+            "total": self.total,
+            "done": self.done,
+            "progress": round(self.done / self.total, 4) if self.total else 0.0,
+            "rate_per_s": self.rate,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "last_error": self.last_error,
+        })
+
+
+tts_warmup = TTSWarmup()
+
+
+async def run_tts_warmup_schedule(db: AsyncIOMotorDatabase) -> None:
+    """
+    งานเบื้องหลังจาก lifespan: warmup ตอน startup (ถ้าเปิด) แล้วซ้ำทุก TTS_WARMUP_INTERVAL วินาที
+    """
+    if TTS_WARMUP_ON_STARTUP:
+        tts_warmup.start(db)
+    if TTS_WARMUP_INTERVAL <= 0:
+        return
+    while True:
+        await asyncio.sleep(TTS_WARMUP_INTERVAL)
+        tts_warmup.start(db)
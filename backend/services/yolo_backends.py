@@ -0,0 +1,128 @@
+# backend/services/yolo_backends.py
+import json
+import logging
+import os
+import shutil
+from typing import Optional
+
+logger = logging.getLogger("yolo_backends")
+
+# pytorch (เดิม) | onnx | openvino | torchscript
+YOLO_BACKEND = os.getenv("YOLO_BACKEND", "pytorch").lower()
+YOLO_INT8 = os.getenv("YOLO_INT8", "false").lower() == "true"
+YOLO_EXPORT_DIR = os.getenv("YOLO_EXPORT_DIR", os.path.join("model_cache", "yolo"))
+# dataset สำหรับ calibrate INT8 ของ OpenVINO
+YOLO_INT8_DATA = os.getenv("YOLO_INT8_DATA", os.path.join("yolo_train", "coco128.yaml"))
+YOLO_EXPORT_IMGSZ = int(os.getenv("YOLO_INPUT_SIZE", "640"))
+
+SUPPORTED_BACKENDS = ("pytorch", "onnx", "openvino", "torchscript")
+_MANIFEST = "export.json"
+
+
+def _export_dir(weights: str, backend: str, int8: bool) -> str:
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(YOLO_EXPORT_DIR, f"{stem}_{backend}{'_int8' if int8 else ''}")
+
+
+def _read_manifest(directory: str) -> Optional[str]:
+    manifest = os.path.join(directory, _MANIFEST)
+    if not os.path.exists(manifest):
+        return None
+    with open(manifest, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # model_file อยู่ relative กับโฟลเดอร์ export (manifest รุ่นเก่าเก็บ model_path เต็ม)
+    path = os.path.join(directory, data["model_file"]) if data.get("model_file") else data.get("model_path")
+    return path if path and os.path.exists(path) else None
+
+
+def _write_manifest(directory: str, data: dict) -> None:
+    path = os.path.join(directory, _MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _quantize_onnx(onnx_path: str) -> str:
+    # ultralytics ยังไม่ทำ INT8 ให้ ONNX จึงใช้ dynamic quantization ของ onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = onnx_path.replace(".onnx", "_int8.onnx")
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def export_model(weights: str, backend: str, int8: bool = False) -> str:
+    """
+    export โมเดล .pt เป็น backend ที่เลือกไว้ใน YOLO_EXPORT_DIR (ทำครั้งแรกครั้งเดียว) แล้วคืน path ที่ YOLO() โหลดได้
+    export ลงโฟลเดอร์ชั่วคราวของ process นี้ก่อนแล้วค่อย rename เข้าที่ ถ้าหลาย worker export พร้อมกัน
+    ตัวที่เสร็จก่อนชนะ ตัวอื่นใช้ผลนั้นแทน (ไม่มีใครเห็นโฟลเดอร์ที่ export ไม่เสร็จ)
+    """
+    directory = _export_dir(weights, backend, int8)
+    tmp_dir = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        model_file = _export_into(weights, backend, int8, tmp_dir)
+        _write_manifest(tmp_dir, {"model_file": model_file, "source": weights, "backend": backend, "int8": int8})
+        if os.path.isdir(directory) and _read_manifest(directory) is None:
+            # โฟลเดอร์ค้างจากการ export ที่ไม่เสร็จ (ไม่มี manifest)
+            shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            cached = _read_manifest(directory)
+            if cached is None:
+                raise
+            logger.info(f"{directory} was exported by another worker; using it")
+            return cached
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return os.path.join(directory, model_file)
+
+
+def _export_into(weights: str, backend: str, int8: bool, directory: str) -> str:
+    # export ใน directory แล้วคืน path ของโมเดลแบบ relative กับ directory
+    from ultralytics import YOLO
+
+    local_weights = os.path.join(directory, os.path.basename(weights))
+    if not os.path.exists(weights):
+        YOLO(weights)  # ให้ ultralytics ดาวน์โหลด weights มาตรฐานก่อน
+    shutil.copy2(weights, local_weights)
+
+    kwargs = {"format": backend, "imgsz": YOLO_EXPORT_IMGSZ}
+    if backend in ("onnx", "openvino"):
+        # dynamic batch เพื่อให้ micro-batching ส่งหลายภาพต่อครั้งได้
+        kwargs["dynamic"] = True
+    if int8 and backend == "openvino":
+        kwargs.update({"int8": True, "data": YOLO_INT8_DATA})
+    elif int8 and backend == "torchscript":
+        logger.warning("INT8 is not supported for the torchscript backend; exporting fp32")
+
+    logger.info(f"Exporting {weights} to {backend} (int8={int8}) in {directory}")
+    model_path = str(YOLO(local_weights).export(**kwargs))
+    if int8 and backend == "onnx":
+        model_path = _quantize_onnx(model_path)
+    return os.path.relpath(model_path, directory)
+
+
+def resolve_model_path(weights: str, backend: str = YOLO_BACKEND, int8: bool = YOLO_INT8) -> str:
+    """
+    คืน path ของโมเดลสำหรับ backend ที่เลือก ใช้ไฟล์ที่ export ไว้แล้วถ้ามี
+    """
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported YOLO_BACKEND: {backend} (expected one of {SUPPORTED_BACKENDS})")
+    if backend == "pytorch":
+        return weights
+    cached = _read_manifest(_export_dir(weights, backend, int8))
+    if cached:
+        return cached
+    return export_model(weights, backend, int8)
+
+
+def load_yolo_model(weights: str, backend: str = YOLO_BACKEND, int8: bool = YOLO_INT8):
+    from ultralytics import YOLO
+
+    model_path = resolve_model_path(weights, backend, int8)
+    logger.info(f"Loading YOLO model: {model_path} (backend={backend})")
+    return YOLO(model_path, task="detect")
@@ -1,10 +1,205 @@
-from ultralytics import YOLO
+import asyncio
+import os
+import time
+import numpy as np
+from PIL import Image
+from backend.services.batching import MicroBatcher
+from backend.services.inference_executor import run_inference
+from backend.services.metrics import Counters, Histogram
+from backend.services.model_registry import model_registry
+from backend.services.yolo_backends import load_yolo_model
 
-yolo_model = YOLO("yolov8s.pt")
+YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "yolov8s.pt")
 
-def detect_object(image):
-    results = yolo_model(image)[0]
+# micro-batching: รวมภาพได้สูงสุด YOLO_BATCH_SIZE ภาพ หรือรอไม่เกิน YOLO_BATCH_WAIT_MS (1 = ปิด batching)
+YOLO_BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE", "8"))
+YOLO_BATCH_WAIT_MS = float(os.getenv("YOLO_BATCH_WAIT_MS", "10"))
+
+# cascade: รันโมเดลเล็กก่อน ถ้า confidence ของกล่องที่ดีที่สุดไม่ถึง threshold ค่อยรันโมเดลถัดไป
+# เช่น YOLO_CASCADE_MODELS="model/yolov8n.pt,yolov8s.pt" YOLO_CASCADE_THRESHOLDS="0.6"
+YOLO_CASCADE_MODELS = [m.strip() for m in os.getenv("YOLO_CASCADE_MODELS", "").split(",") if m.strip()]
+YOLO_CASCADE_THRESHOLDS = [float(t) for t in os.getenv("YOLO_CASCADE_THRESHOLDS", "0.5").split(",") if t.strip()]
+YOLO_CASCADE_ENABLED = len(YOLO_CASCADE_MODELS) > 1
+
+# กล่องที่ confidence ถึงค่านี้นับเป็นวัตถุในภาพ (ใช้วัดความรกของฉากในโหมด auto)
+YOLO_OBJECT_CONFIDENCE = float(os.getenv("YOLO_OBJECT_CONFIDENCE", "0.3"))
+# จำนวนวัตถุ (class ไม่ซ้ำ) สูงสุดที่คืนต่อภาพ
+YOLO_TOP_K = int(os.getenv("YOLO_TOP_K", "5"))
+
+
+def _load_yolo():
+    # import ultralytics เฉพาะตอนโหลดโมเดลจริง (backend ตาม YOLO_BACKEND)
+    return load_yolo_model(YOLO_MODEL_PATH)
+
+
+def _warmup_yolo(yolo_model):
+    yolo_model(Image.new("RGB", (640, 640)), verbose=False)
+
+
+def _load_cascade():
+    return [load_yolo_model(path) for path in YOLO_CASCADE_MODELS]
+
+
+def _warmup_cascade(models):
+    for yolo_model in models:
+        _warmup_yolo(yolo_model)
+
+
+# เมื่อเปิด cascade จะใช้เฉพาะ yolo_cascade จึงลงทะเบียนแทน yolo (PRELOAD_MODELS=yolo โหลด cascade แทน)
+if YOLO_CASCADE_ENABLED:
+    model_registry.register("yolo_cascade", _load_cascade, _warmup_cascade, replaces="yolo")
+else:
+    model_registry.register("yolo", _load_yolo, _warmup_yolo)
+
+
+class CascadeStats:
+    """
+    สถิติของแต่ละ stage ใน cascade (จำนวนภาพที่รัน / ที่ยอมรับผล และ latency ต่อ batch)
+    หมายเหตุ: เมื่อใช้ INFERENCE_EXECUTOR=process ค่าเหล่านี้จะอยู่ใน worker process
+    """
+
+    def __init__(self, stages: int):
+        self.counters = Counters("images")
+        self.latency_ms = [Histogram() for _ in range(stages)]
+
+    def stats(self):
+        images = self.counters.get("images")
+        stages = []
+        for i, (path, latency) in enumerate(zip(YOLO_CASCADE_MODELS, self.latency_ms)):
+            runs = self.counters.get(f"stage_{i}_runs")
+            accepted = self.counters.get(f"stage_{i}_accepted")
+            stages.append({
+                "model": path,
+                "threshold": _threshold(i),
+                "runs": runs,
+                "accepted": accepted,
+                "hit_rate": round(accepted / runs, 4) if runs else 0.0,
+                "batch_latency_ms": latency.snapshot(),
+            })
+        return {"enabled": YOLO_CASCADE_ENABLED, "images": images, "stages": stages}
+
+
+cascade_stats = CascadeStats(len(YOLO_CASCADE_MODELS))
+
+
+def _threshold(stage: int) -> float:
+    # stage สุดท้ายยอมรับผลเสมอ
+    if stage >= len(YOLO_CASCADE_MODELS) - 1:
+        return 0.0
+    if stage < len(YOLO_CASCADE_THRESHOLDS):
+        return YOLO_CASCADE_THRESHOLDS[stage]
+    return YOLO_CASCADE_THRESHOLDS[-1] if YOLO_CASCADE_THRESHOLDS else 0.5
+
+
+def _best_detection(yolo_model, results):
+    """
+    สรุปผลของภาพหนึ่งภาพ: label + confidence ของกล่องที่ดีที่สุด จำนวน class ที่พบ
+    และวัตถุ top-K ที่ class ไม่ซ้ำกัน (ใช้ argsort ครั้งเดียว ย้ายข้อมูลจาก device ครั้งเดียว)
+    """
     if len(results.boxes) == 0:
         return None
-    best_box = max(results.boxes, key=lambda b: b.conf.cpu().item())
-    return yolo_model.model.names[int(best_box.cls.cpu().item())]
+    # data: [x1, y1, x2, y2, (track_id), conf, cls]
+    data = results.boxes.data.cpu().numpy()
+    conf, cls = data[:, -2], data[:, -1].astype(int)
+    order = np.argsort(-conf, kind="stable")
+    # ตำแหน่งแรกของแต่ละ class หลังเรียงตาม confidence = กล่องที่ดีที่สุดของ class นั้น
+    _, first = np.unique(cls[order], return_index=True)
+    distinct = order[np.sort(first)]
+    confident = distinct[conf[distinct] >= YOLO_OBJECT_CONFIDENCE]
+    top = confident[:YOLO_TOP_K] if len(confident) else distinct[:1]
+
+    objects = [
+        {
+            "label": yolo_model.names[int(cls[i])],
+            "confidence": round(float(conf[i]), 4),
+            "box": [round(float(v), 1) for v in data[i, :4]],
+        }
+        for i in top
+    ]
+    best = order[0]
+    return {
+        "label": yolo_model.names[int(cls[best])],
+        "confidence": float(conf[best]),
+        "num_classes": int(len(confident)),
+        "objects": objects,
+    }
+
+
+def _cascade_batch(images):
+    models = model_registry.get("yolo_cascade")
+    detections = [None] * len(images)
+    pending = list(range(len(images)))
+    cascade_stats.counters.inc("images", len(images))
+    for stage, yolo_model in enumerate(models):
+        if not pending:
+            break
+        started = time.perf_counter()
+        results = yolo_model([images[i] for i in pending])
+        cascade_stats.latency_ms[stage].observe((time.perf_counter() - started) * 1000)
+        cascade_stats.counters.inc(f"stage_{stage}_runs", len(pending))
+        threshold = _threshold(stage)
+        still_pending = []
+        for i, result in zip(pending, results):
+            detection = _best_detection(yolo_model, result)
+            if detection and detection["confidence"] >= threshold:
+                detections[i] = detection
+                cascade_stats.counters.inc(f"stage_{stage}_accepted")
+            else:
+                # เก็บผลของ stage นี้ไว้ใช้ในกรณีที่ stage ถัดไปหาอะไรไม่เจอเลย
+                if detection and (detections[i] is None or detection["confidence"] > detections[i]["confidence"]):
+                    detections[i] = detection
+                still_pending.append(i)
+        pending = still_pending
+    return detections
+
+
+def detect_detections_batch(images):
+    """
+    คืนค่าสรุปผล (ดู _best_detection) ต่อภาพ หรือ None ถ้าไม่พบวัตถุ
+    """
+    if YOLO_CASCADE_ENABLED:
+        return _cascade_batch(images)
+    # forward pass เดียวสำหรับทุกภาพใน batch
+    yolo_model = model_registry.get("yolo")
+    return [_best_detection(yolo_model, results) for results in yolo_model(images)]
+
+
+def detect_objects_batch(images):
+    return [detection["label"] if detection else None for detection in detect_detections_batch(images)]
+
+
+def detect_object(image):
+    return detect_objects_batch([image])[0]
+
+
+async def _run_yolo_batch(images):
+    return await run_inference(detect_detections_batch, images)
+
+
+yolo_batcher = MicroBatcher("yolo", _run_yolo_batch, YOLO_BATCH_SIZE, YOLO_BATCH_WAIT_MS)
+
+
+async def detect_detection_async(image):
+    # รันใน inference executor เพื่อไม่ให้บล็อก event loop
+    if YOLO_BATCH_SIZE > 1:
+        return await yolo_batcher.submit(image)
+    return (await run_inference(detect_detections_batch, [image]))[0]
+
+
+async def detect_object_async(image):
+    detection = await detect_detection_async(image)
+    return detection["label"] if detection else None
+
+
+async def detect_detections_async(images):
+    # ภาพหลายภาพจาก request เดียว ส่งตรงเป็น batch ละไม่เกิน YOLO_BATCH_SIZE ภาพ
+    images = list(images)
+    step = max(1, YOLO_BATCH_SIZE)
+    chunks = await asyncio.gather(*[
+        run_inference(detect_detections_batch, images[i:i + step]) for i in range(0, len(images), step)
+    ])
+    return [detection for chunk in chunks for detection in chunk]
+
+
+async def detect_objects_async(images):
+    return [detection["label"] if detection else None for detection in await detect_detections_async(images)]
@@ -45,7 +45,7 @@ export function CreateImagePage({ token, onRequireLogin }) {
         const endTime = Date.now();
         const elapsedSec = ((endTime - startTimeRef.current) / 1000).toFixed(2);
 
-        setGeneratedImage(data.image_url);
+        setGeneratedImage(`http://localhost:8000${data.image_url}`);
         setImageInfo({
           resolution: data.resolution || null,
           duration: elapsedSec,